@@ -8,9 +8,14 @@
 
 import sys
 
-from lib import importer
+from lib import action_client
 from lib.utils import log
 
 if __name__ == "__main__":
     log("Stub media importer started")
-    importer.run(sys.argv)
+
+    # let the observer service execute the action if it is running to benefit from its warm state
+    if not action_client.forward_action(sys.argv):
+        from lib import importer
+
+        importer.run(sys.argv)
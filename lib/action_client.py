@@ -0,0 +1,60 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+import json
+import os
+from typing import List
+
+import xbmc  # pylint: disable=import-error
+
+from lib.utils import get_profile_path, log
+
+ACTION_SERVER_SOCKET = "importer.sock"
+# timeout in seconds for connecting to a running action server
+ACTION_SERVER_CONNECT_TIMEOUT = 1
+
+
+# this module is imported by every importer action so it must only import (and do) what is really necessary
+def forward_action(argv: List[str]) -> bool:
+    # returns whether the action has been handled by a running action server
+    # the socket only exists while the observer service is running (or if it hasn't been stopped properly)
+    socket_path = get_profile_path(ACTION_SERVER_SOCKET)
+    if not os.path.exists(socket_path):
+        return False
+
+    import socket  # pylint: disable=import-outside-toplevel
+
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            client.settimeout(ACTION_SERVER_CONNECT_TIMEOUT)
+            client.connect(socket_path)
+        except OSError:
+            # the socket is a leftover from a service which is no longer running
+            return False
+
+        # executing the action might take a while (e.g. imports)
+        client.settimeout(None)
+
+        try:
+            client.sendall(json.dumps({"argv": list(argv)}).encode("utf-8") + b"\n")
+            response = json.loads(client.makefile("rb").readline() or b"{}")
+        except (OSError, ValueError) as e:
+            # the action might already have been (partially) executed so it must not be executed again
+            log(f"failed to forward action to the action server: {e}", xbmc.LOGERROR)
+            return True
+    finally:
+        client.close()
+
+    if not response.get("success"):
+        log(f"action server failed to execute action: {response.get('error')}", xbmc.LOGERROR)
+
+    return True
@@ -0,0 +1,106 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+import json
+import os
+import socket
+import socketserver
+import threading
+
+import xbmc  # pylint: disable=import-error
+
+from lib.action_client import ACTION_SERVER_SOCKET
+from lib.utils import get_profile_path, log
+
+
+def is_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+class ActionServer:
+    class _Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                request = json.loads(self.rfile.readline())
+                argv = request["argv"]
+            except (ValueError, KeyError, TypeError) as e:
+                self._respond(False, f"invalid request: {e}")
+                return
+
+            try:
+                # importing lib.importer once keeps all of its modules and caches warm across actions
+                from lib import importer  # pylint: disable=import-outside-toplevel
+
+                importer.run(argv)
+            except Exception as e:  # pylint: disable=broad-except
+                log(f"failed to execute action {argv}: {e}", xbmc.LOGERROR)
+                self._respond(False, str(e))
+                return
+
+            self._respond(True)
+
+        def _respond(self, success: bool, error: str = None):
+            response = {"success": success}
+            if error:
+                response["error"] = error
+
+            try:
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            except OSError:
+                pass
+
+    def __init__(self):
+        self._server = None
+        self._thread = None
+        self._socket_path = None
+
+    def start(self) -> bool:
+        if self._server:
+            return True
+
+        if not is_supported():
+            log("action server not supported on this platform", xbmc.LOGDEBUG)
+            return False
+
+        self._socket_path = get_profile_path(ACTION_SERVER_SOCKET)
+        self._remove_socket()
+
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self._socket_path, ActionServer._Handler)
+        except OSError as e:
+            log(f"failed to start action server on {self._socket_path}: {e}", xbmc.LOGWARNING)
+            self._server = None
+            return False
+
+        # don't let actions which are still being executed block the shutdown of the service
+        self._server.daemon_threads = True
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ActionServer", daemon=True)
+        self._thread.start()
+
+        log(f"action server listening on {self._socket_path}")
+        return True
+
+    def stop(self):
+        if not self._server:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._remove_socket()
+
+        self._server = None
+        self._thread = None
+        log("action server stopped")
+
+    def _remove_socket(self):
+        try:
+            os.unlink(self._socket_path)
+        except OSError:
+            pass
@@ -0,0 +1,122 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+from collections import OrderedDict
+import time
+from typing import Iterable, List, Tuple
+
+import xbmcgui  # pylint: disable=import-error
+import xbmcmediaimport  # pylint: disable=import-error
+
+ADDED = xbmcmediaimport.MediaImportChangesetTypeAdded
+CHANGED = xbmcmediaimport.MediaImportChangesetTypeChanged
+REMOVED = xbmcmediaimport.MediaImportChangesetTypeRemoved
+
+
+def fold_changeset_types(previous: int, current: int) -> int:
+    # returns the changeset type covering both changes of an item or None if the item doesn't have to be changed
+    if previous == ADDED:
+        # an item which has been added and removed again never has to be passed to Kodi
+        if current == REMOVED:
+            return None
+        return ADDED
+
+    if previous == REMOVED and current != REMOVED:
+        # the item already exists in Kodi
+        return CHANGED
+
+    return current
+
+
+class ChangeBatcher:
+    # time in seconds without any further changes after which the collected changes are passed on
+    WINDOW = 1.0
+    # maximum time in seconds a change is delayed by further changes
+    MAX_LATENCY = 5.0
+    # maximum number of changes passed on at once
+    MAX_BATCH_SIZE = 500
+
+    def __init__(self, window: float = WINDOW, max_latency: float = MAX_LATENCY, max_batch_size: int = MAX_BATCH_SIZE):
+        if window < 0 or max_latency < window:
+            raise ValueError("invalid window or max_latency")
+        if max_batch_size <= 0:
+            raise ValueError("invalid max_batch_size")
+
+        self._window = window
+        self._max_latency = max_latency
+        self._max_batch_size = max_batch_size
+
+        # item ID => (changeset type, item, item ID) in the order of the first change of every item
+        self._pending = OrderedDict()
+        self._first_change = None
+        self._last_change = None
+        self._changes = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, changes: Iterable[Tuple[int, xbmcgui.ListItem, str]]):
+        now = time.monotonic()
+        for (changeset_type, item, item_id) in changes:
+            if not item:
+                continue
+
+            self._changes += 1
+
+            # changes of items without an identifier cannot be folded
+            key = item_id if item_id else ("", self._changes)
+
+            previous = self._pending.get(key)
+            if previous:
+                changeset_type = fold_changeset_types(previous[0], changeset_type)
+                if changeset_type is None:
+                    del self._pending[key]
+                    continue
+
+            self._pending[key] = (changeset_type, item, item_id)
+
+            if self._first_change is None:
+                self._first_change = now
+            self._last_change = now
+
+        if not self._pending:
+            self._first_change = None
+
+    def due(self) -> bool:
+        if not self._pending:
+            return False
+
+        # don't wait for the window to pass if a full batch is available or the oldest change has waited long enough
+        now = time.monotonic()
+        return (
+            len(self._pending) >= self._max_batch_size
+            or now - self._last_change >= self._window
+            or now - self._first_change >= self._max_latency
+        )
+
+    def take(self) -> List[Tuple[int, xbmcgui.ListItem, str]]:
+        batch = []
+        while self._pending and len(batch) < self._max_batch_size:
+            batch.append(self._pending.popitem(last=False)[1])
+
+        # the remaining changes have been waiting for as long as the ones which have been taken
+        if not self._pending:
+            self._first_change = None
+
+        return batch
+
+    def next_due(self) -> float:
+        # time in seconds until the collected changes are due or None if there are no changes
+        if not self._pending:
+            return None
+
+        if len(self._pending) >= self._max_batch_size:
+            return 0.0
+
+        now = time.monotonic()
+        return max(0.0, min(self._last_change + self._window, self._first_change + self._max_latency) - now)
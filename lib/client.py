@@ -0,0 +1,282 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import http.client
+import select
+import socket
+import threading
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from six.moves.urllib.parse import urljoin, urlparse
+
+from lib.json_stream import iter_json_items
+from lib.settings import ProviderSettings
+
+
+class ProviderClient:
+    # maximum number of concurrent (and pooled) connections per media provider
+    DEFAULT_MAX_CONNECTIONS = 4
+    # timeout in seconds for a single request
+    DEFAULT_TIMEOUT = 30
+    # number of bytes read at once from a streamed response
+    STREAM_CHUNK_SIZE = 64 * 1024
+    # methods of requests which can safely be sent again
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+    # errors indicating that the media provider has closed a pooled connection before responding to a request
+    STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+    class Response:  # pylint: disable=too-few-public-methods
+        def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+            self.status = status
+            self.headers = headers
+            self.body = body
+
+    _clients = {}
+    _clients_lock = threading.Lock()
+
+    def __init__(self, url: str, max_connections: int = DEFAULT_MAX_CONNECTIONS, timeout: float = DEFAULT_TIMEOUT):
+        if not url:
+            raise ValueError("invalid url")
+        if max_connections <= 0:
+            raise ValueError("invalid max_connections")
+
+        url_parts = urlparse(url)
+        if url_parts.scheme not in ("http", "https") or not url_parts.netloc:
+            raise ValueError(f"unsupported url {url}")
+
+        self._url = url
+        self._url_parts = url_parts
+        self._max_connections = max_connections
+        self._timeout = timeout
+
+        # idle keep-alive connections
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._connection_slots = threading.BoundedSemaphore(max_connections)
+
+    @staticmethod
+    def for_provider(obj, **kwargs) -> "ProviderClient":
+        # share the client (and its connections) between all users of the same media provider URL
+        url = ProviderSettings.get_url(obj)
+
+        with ProviderClient._clients_lock:
+            client = ProviderClient._clients.get(url)
+            if not client:
+                client = ProviderClient(url, **kwargs)
+                ProviderClient._clients[url] = client
+
+            return client
+
+    @staticmethod
+    def close_all():
+        with ProviderClient._clients_lock:
+            for client in ProviderClient._clients.values():
+                client.close()
+            ProviderClient._clients.clear()
+
+    @property
+    def url(self) -> str:
+        return self._url
+
+    def request(
+        self, method: str, path: str, body: bytes = None, headers: Dict[str, str] = None, timeout: float = None
+    ) -> "ProviderClient.Response":
+        if timeout is None:
+            timeout = self._timeout
+
+        target = self._target(path)
+
+        with self._connection_slots:
+            connection, reused = self._acquire_connection(timeout)
+            try:
+                (connection, response) = self._send_retrying(
+                    connection, reused, method, target, body, headers, timeout
+                )
+                response = self._read_response(response)
+            except BaseException:
+                connection.close()
+                raise
+
+            self._release_connection(connection, response)
+
+        return response
+
+    def request_all(
+        self, requests: Iterable[Tuple[str, str]], timeout: float = None
+    ) -> List["ProviderClient.Response"]:
+        # execute (method, path) requests concurrently on up to max_connections connections
+        requests = list(requests)
+        if not requests:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self._max_connections, len(requests))) as executor:
+            futures = [executor.submit(self.request, method, path, timeout=timeout) for (method, path) in requests]
+            return [future.result() for future in futures]
+
+    def get(self, path: str, headers: Dict[str, str] = None, timeout: float = None) -> "ProviderClient.Response":
+        return self.request("GET", path, headers=headers, timeout=timeout)
+
+    def get_json_items(
+        self, path: str, items_key: str = None, headers: Dict[str, str] = None, timeout: float = None
+    ) -> Iterator[Dict]:
+        # decode the items of a (huge) JSON listing one at a time while the response is being received
+        # see lib.json_stream.iter_json_items() for the supported JSON documents
+        if timeout is None:
+            timeout = self._timeout
+
+        target = self._target(path)
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", "gzip, deflate")
+
+        with self._connection_slots:
+            connection, reused = self._acquire_connection(timeout)
+            try:
+                (connection, response) = self._send_retrying(connection, reused, "GET", target, None, headers, timeout)
+
+                if response.status != 200:
+                    raise RuntimeError(f"unexpected status {response.status} for {path} from {self._url}")
+
+                chunks = iter(partial(response.read, ProviderClient.STREAM_CHUNK_SIZE), b"")
+                yield from iter_json_items(
+                    chunks, items_key=items_key, content_encoding=response.getheader("Content-Encoding")
+                )
+
+                # the whole body has to be read before the connection can be re-used
+                for _ in chunks:
+                    pass
+            except BaseException:
+                # also covers the consumer not retrieving all items
+                connection.close()
+                raise
+
+            self._release_connection(
+                connection,
+                ProviderClient.Response(
+                    response.status, {key.lower(): value for (key, value) in response.getheaders()}, b""
+                ),
+            )
+
+    def connect(
+        self, path: str, headers: Dict[str, str] = None, timeout: float = None
+    ) -> Tuple[socket.socket, http.client.HTTPResponse]:
+        # open a dedicated (not pooled) connection for a long-lived response (e.g. an event stream)
+        # the caller is responsible for closing the returned socket which also unblocks reading the response
+        if timeout is None:
+            timeout = self._timeout
+
+        connection = self._new_connection(timeout)
+        try:
+            # the connection lets go of its socket if the media provider announces to close it after the response
+            connection.connect()
+            sock = connection.sock
+            response = self._send(connection, "GET", self._target(path), None, headers)
+        except BaseException:
+            connection.close()
+            raise
+
+        return (sock, response)
+
+    def close(self):
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+
+    def _target(self, path: str) -> str:
+        url_parts = urlparse(urljoin(self._url, path))
+        if url_parts.netloc != self._url_parts.netloc:
+            raise ValueError(f"{path} doesn't belong to {self._url}")
+
+        target = url_parts.path or "/"
+        if url_parts.query:
+            target = f"{target}?{url_parts.query}"
+
+        return target
+
+    def _acquire_connection(self, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        while True:
+            with self._connections_lock:
+                if not self._connections:
+                    break
+                connection = self._connections.pop()
+
+            # an idle connection is only readable if the media provider has closed it
+            if not connection.sock or select.select([connection.sock], [], [], 0)[0]:
+                connection.close()
+                continue
+
+            connection.timeout = timeout
+            connection.sock.settimeout(timeout)
+            return (connection, True)
+
+        return (self._new_connection(timeout), False)
+
+    def _new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        if self._url_parts.scheme == "https":
+            return http.client.HTTPSConnection(self._url_parts.netloc, timeout=timeout)
+
+        return http.client.HTTPConnection(self._url_parts.netloc, timeout=timeout)
+
+    def _release_connection(self, connection: http.client.HTTPConnection, response: "ProviderClient.Response"):
+        # only keep the connection if the media provider hasn't asked to close it
+        if response.headers.get("connection", "").lower() == "close":
+            connection.close()
+            return
+
+        with self._connections_lock:
+            if len(self._connections) < self._max_connections:
+                self._connections.append(connection)
+                return
+
+        connection.close()
+
+    @staticmethod
+    def _send(
+        connection: http.client.HTTPConnection, method: str, target: str, body: bytes, headers: Dict[str, str]
+    ) -> http.client.HTTPResponse:
+        connection.request(method, target, body=body, headers=headers or {})
+        return connection.getresponse()
+
+    # pylint: disable=too-many-arguments
+    def _send_retrying(
+        self,
+        connection: http.client.HTTPConnection,
+        reused: bool,
+        method: str,
+        target: str,
+        body: bytes,
+        headers: Dict[str, str],
+        timeout: float,
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        # returns the connection (which might have been replaced) and the response
+        try:
+            return (connection, ProviderClient._send(connection, method, target, body, headers))
+        except ProviderClient.STALE_CONNECTION_ERRORS:
+            # a pooled connection might have been closed by the media provider in the meantime
+            # but the media provider might also have received the request (e.g. before crashing)
+            if not reused or method.upper() not in ProviderClient.IDEMPOTENT_METHODS:
+                raise
+
+        connection.close()
+        connection = self._new_connection(timeout)
+        try:
+            return (connection, ProviderClient._send(connection, method, target, body, headers))
+        except BaseException:
+            connection.close()
+            raise
+
+    @staticmethod
+    def _read_response(response: http.client.HTTPResponse) -> "ProviderClient.Response":
+        # the whole body has to be read before the connection can be re-used
+        body = response.read()
+
+        return ProviderClient.Response(
+            response.status, {key.lower(): value for (key, value) in response.getheaders()}, body
+        )
@@ -6,10 +6,10 @@
 #  See LICENSES/README.md for more information.
 #
 
+import heapq
+import math
 import time
 
-from six import iteritems
-
 import xbmc  # pylint: disable=import-error
 import xbmcmediaimport  # pylint: disable=import-error
 
@@ -18,34 +18,79 @@ from lib.utils import log
 
 
 class DiscoveryService:
+    # minimum interval in seconds between two discoveries (used after the set of servers has changed)
+    MIN_DISCOVERY_INTERVAL = 1.0
+    # maximum interval in seconds between two discoveries (reached while the set of servers doesn't change)
+    MAX_DISCOVERY_INTERVAL = 30.0
+    # time in seconds after which a server which hasn't been seen anymore is deactivated
+    EXPIRY_TIMEOUT = 10.0
+    # minimum number of discoveries a server must have missed before it is deactivated
+    EXPIRY_DISCOVERIES = 2
+    # expiry times are rounded up to multiples of this many seconds to check close servers at once
+    EXPIRY_RESOLUTION = 1.0
+
     class Server:
         def __init__(self):
             self.id = ""
             self.name = ""
             self.address = ""
             self.registered = False
-            self.last_seen = None
-
-        def is_expired(self, timeout_s: int):
-            return self.registered and self.last_seen + timeout_s < time.time()
+            # monotonic time in seconds when the server has been seen for the last time
+            self.last_seen = time.monotonic()
+
+        def expires(self, timeout_s: float) -> float:
+            return self.last_seen + timeout_s
+
+        def is_expired(self, timeout_s: float) -> bool:
+            return self.registered and self.expires(timeout_s) <= time.monotonic()
+
+    def __init__(
+        self,
+        min_discovery_interval: float = MIN_DISCOVERY_INTERVAL,
+        max_discovery_interval: float = MAX_DISCOVERY_INTERVAL,
+        expiry_timeout: float = EXPIRY_TIMEOUT,
+        expiry_discoveries: int = EXPIRY_DISCOVERIES,
+    ):
+        if min_discovery_interval <= 0 or max_discovery_interval < min_discovery_interval:
+            raise ValueError("invalid min_discovery_interval or max_discovery_interval")
+        if expiry_timeout <= 0:
+            raise ValueError("invalid expiry_timeout")
+        if expiry_discoveries <= 0:
+            raise ValueError("invalid expiry_discoveries")
 
-    def __init__(self):
         self._monitor = Monitor()
         self._servers = {}
 
+        self._min_discovery_interval = min_discovery_interval
+        self._max_discovery_interval = max_discovery_interval
+        self._discovery_interval = min_discovery_interval
+        self._next_discovery = time.monotonic()
+
+        self._expiry_timeout = expiry_timeout
+        self._expiry_discoveries = expiry_discoveries
+        # heap of (expiry time, server identifier) of registered servers so only servers which are due are checked
+        # expiry times are only moved forward when the server is checked (and has been seen in the meantime)
+        self._expiry_heap = []
+        # server identifier => expiry time of the server's current entry in the expiry heap (other entries are stale)
+        self._expiry_scheduled = {}
+
         # TODO(stub): add additional members
 
         self._start()
 
-    def _discover(self):
+    def _discover(self) -> bool:
+        # returns whether a new or changed server has been discovered
         server = None
 
         # TODO(stub): execute discovery
+        # TODO(stub): create a new DiscoveryService.Server for every discovered server
 
         if server:
-            self._add_server(server)
+            return self._add_server(server)
+
+        return False
 
-    def _add_server(self, server: DiscoveryService.Server):  # noqa F821
+    def _add_server(self, server: "DiscoveryService.Server") -> bool:
         register_server = False
 
         # check if the server is already known
@@ -67,7 +112,7 @@ class DiscoveryService:
 
         # if the server doesn"t need to be registered there"s nothing else to do
         if not register_server:
-            return
+            return False
 
         # TODO(stub): create / determine a unique media provider identifier
         provider_id = "stub"
@@ -94,7 +139,7 @@ class DiscoveryService:
         settings = media_provider.prepareSettings()
         if not settings:
             log("cannot prepare media provider settings", xbmc.LOGERROR)
-            return
+            return True
 
         # TODO(stub): store the URL to the media provider in the settings
         settings.setString("stub.url", server.address)
@@ -102,20 +147,72 @@ class DiscoveryService:
         # add the media provider and activate it
         if xbmcmediaimport.addAndActivateProvider(media_provider):
             self._servers[server.id].registered = True
+            self._schedule_expiry(self._servers[server.id])
             log(f'stub server "{server.name}" ({server.id}) successfully added and activated')
         else:
             self._servers[server.id].registered = False
             log(f'failed to add and/or activate stub server "{server.name}" ({server.id})')
 
-    def _expire_servers(self):
-        for server_id, server in iteritems(self._servers):
-            # expire the server after 10 seconds
-            if not server.is_expired(10):
+        return True
+
+    def _get_expiry_timeout(self) -> float:
+        # servers must not expire just because discoveries have become less frequent
+        return max(self._expiry_timeout, self._expiry_discoveries * self._discovery_interval)
+
+    def _schedule_expiry(self, server: "DiscoveryService.Server"):
+        expires = server.expires(self._get_expiry_timeout())
+        expires = math.ceil(expires / DiscoveryService.EXPIRY_RESOLUTION) * DiscoveryService.EXPIRY_RESOLUTION
+
+        # a server which is (re-)registered while it is scheduled is only checked earlier if its expiry timeout has
+        # decreased in the meantime
+        scheduled = self._expiry_scheduled.get(server.id)
+        if scheduled is not None and scheduled <= expires:
+            return
+
+        heapq.heappush(self._expiry_heap, (expires, server.id))
+        self._expiry_scheduled[server.id] = expires
+
+    def _expire_servers(self) -> bool:
+        # returns whether a server has been deactivated
+        expired = False
+        now = time.monotonic()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            (expires, server_id) = heapq.heappop(self._expiry_heap)
+            if self._expiry_scheduled.get(server_id) != expires:
+                continue
+            del self._expiry_scheduled[server_id]
+
+            server = self._servers.get(server_id)
+            if not server or not server.registered:
+                continue
+
+            # the server has been seen again in the meantime
+            if not server.is_expired(self._get_expiry_timeout()):
+                self._schedule_expiry(server)
                 continue
 
             server.registered = False
             xbmcmediaimport.deactivateProvider(server_id)
             log(f'stub server "{server.name}" ({server.id}) deactivated due to inactivity')
+            expired = True
+
+        return expired
+
+    def _schedule_discovery(self, changed: bool):
+        # discover more often after the set of servers has changed and back off while it doesn't change
+        if changed:
+            self._discovery_interval = self._min_discovery_interval
+        else:
+            self._discovery_interval = min(self._discovery_interval * 2, self._max_discovery_interval)
+
+        self._next_discovery = time.monotonic() + self._discovery_interval
+
+    def _get_next_timeout(self) -> float:
+        deadline = self._next_discovery
+        if self._expiry_heap:
+            deadline = min(deadline, self._expiry_heap[0][0])
+
+        return max(0.0, deadline - time.monotonic())
 
     def _start(self):
         log("Looking for stub servers...")
@@ -124,12 +221,15 @@ class DiscoveryService:
 
         while not self._monitor.abortRequested():
             # try to discover servers
-            self._discover()
+            if time.monotonic() >= self._next_discovery:
+                self._schedule_discovery(self._discover())
 
             # expire servers that haven"t responded for a while
-            self._expire_servers()
+            if self._expire_servers():
+                self._schedule_discovery(True)
 
-            if self._monitor.waitForAbort(1):
+            # sleep until the next discovery or until the next server might expire
+            if self._monitor.waitForAbort(self._get_next_timeout()):
                 break
 
         # TODO(stub): cleanup discovery
@@ -0,0 +1,235 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+import hashlib
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Tuple
+import uuid
+
+import xbmc  # pylint: disable=import-error
+import xbmcmediaimport  # pylint: disable=import-error
+
+from lib.utils import get_profile_path, log
+
+# TODO(stub): list the fields of an item object which are used by lib.kodi.Api.to_file_item()
+#             an empty list means that all fields of an item object are considered
+FINGERPRINT_FIELDS = ()
+# TODO(stub): increase whenever lib.kodi.Api.to_file_item() converts the same item object differently
+#             (e.g. with an update of the add-on) to pass all items to Kodi again
+CONVERSION_VERSION = 1
+
+
+def item_digest(item_obj: Dict, salt: str = "") -> str:
+    if FINGERPRINT_FIELDS:
+        item_obj = {field: item_obj.get(field) for field in FINGERPRINT_FIELDS}
+
+    # sorting the keys makes the digest independent of the order of the fields provided by the media provider
+    return hashlib.sha256(
+        json.dumps([CONVERSION_VERSION, salt, item_obj], sort_keys=True, separators=(",", ":"), default=str).encode(
+            "utf-8"
+        )
+    ).hexdigest()
+
+
+class FingerprintSession:
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        import_key: str,
+        media_type: str,
+        known: Dict[str, Tuple[str, str]],
+        skip_unchanged: bool,
+        salt: str = "",
+    ):
+        self.import_key = import_key
+        self.media_type = media_type
+        self.skip_unchanged = skip_unchanged
+        # settings which influence the conversion of all items (e.g. path substitutions)
+        self.salt = salt
+
+        # item ID => (digest, path) of all items which haven't been processed yet
+        self._known = known
+        # item ID => [digest, path] of all processed items
+        self._processed = {}
+        # IDs of items which have been removed on the media provider
+        self._removed = set()
+        self._lock = threading.Lock()
+
+    def process(self, changeset_type: int, item_id: str, item_obj: Dict) -> int:
+        # returns the changeset type to use for the item or None if the item hasn't changed
+        if not item_id:
+            return changeset_type
+
+        digest = item_digest(item_obj, salt=self.salt)
+        with self._lock:
+            known = self._known.pop(item_id, None)
+            self._processed[item_id] = [digest, known[1] if known else None]
+            self._removed.discard(item_id)
+
+        if not self.skip_unchanged:
+            return changeset_type
+
+        if not known:
+            return xbmcmediaimport.MediaImportChangesetTypeAdded
+        if known[0] == digest:
+            return None
+
+        return xbmcmediaimport.MediaImportChangesetTypeChanged
+
+    def set_path(self, item_id: str, path: str):
+        with self._lock:
+            if item_id in self._processed:
+                self._processed[item_id][1] = path
+
+    def remove(self, item_id: str):
+        with self._lock:
+            self._known.pop(item_id, None)
+            self._processed.pop(item_id, None)
+            self._removed.add(item_id)
+
+    def fingerprints(self) -> List[Tuple[str, str, str]]:
+        # (item ID, digest, path) of all processed items
+        with self._lock:
+            return [(item_id, digest, path) for (item_id, (digest, path)) in self._processed.items()]
+
+    def removed_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._removed)
+
+    def removed(self) -> List[Tuple[str, str]]:
+        # items which are no longer provided by the media provider (only known after processing all items)
+        if not self.skip_unchanged:
+            return []
+
+        with self._lock:
+            return [(item_id, path) for (item_id, (_, path)) in self._known.items() if path]
+
+
+class FingerprintStore:
+    # the fingerprints of a media import are only trusted if their generation matches the one stored in the media
+    # import's settings (see lib.settings.ImportSettings.get_fingerprint_generation()) because they outlive the media
+    # import (e.g. if it is removed and added again)
+    def __init__(self, filename: str):
+        if not filename:
+            raise ValueError("invalid filename")
+
+        self._filename = filename
+        self._db = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_import_key(media_import: xbmcmediaimport.MediaImport) -> str:
+        # a media import is identified by its media provider and its media types
+        media_provider_id = media_import.getProvider().getIdentifier()
+        return f"{media_provider_id}|{','.join(sorted(media_import.getMediaTypes()))}"
+
+    def begin(self, import_key: str, media_type: str, skip_unchanged: bool, salt: str = "") -> FingerprintSession:
+        return FingerprintSession(import_key, media_type, self.load(import_key, media_type), skip_unchanged, salt=salt)
+
+    def load(self, import_key: str, media_type: str) -> Dict[str, Tuple[str, str]]:
+        with self._lock:
+            self._open()
+
+            return {
+                item_id: (digest, path)
+                for (item_id, digest, path) in self._db.execute(
+                    "SELECT id, digest, path FROM fingerprints WHERE import = ? AND mediatype = ?",
+                    (import_key, media_type),
+                )
+            }
+
+    @staticmethod
+    def new_generation() -> str:
+        return uuid.uuid4().hex
+
+    def has_fingerprints(self, import_key: str, media_type: str, generation: str) -> bool:
+        # the fingerprints of a media type without any items are known as well once they have been committed
+        if not generation:
+            return False
+
+        with self._lock:
+            self._open()
+
+            return self._get_generation(import_key, media_type) == generation
+
+    def commit(self, session: FingerprintSession, replace: bool, generation: str):
+        # a full import replaces all fingerprints of the media type (and their generation) whereas an import of
+        # changed items only updates them
+        if not generation:
+            raise ValueError("invalid generation")
+
+        fingerprints = session.fingerprints()
+
+        with self._lock:
+            self._open()
+
+            # updating fingerprints which aren't trusted anyway would mix them with the ones of another media import
+            if not replace and self._get_generation(session.import_key, session.media_type) != generation:
+                return
+
+            with self._db:
+                # items which haven't been provided by a full import don't exist anymore
+                if replace:
+                    self._db.execute(
+                        "DELETE FROM fingerprints WHERE import = ? AND mediatype = ?",
+                        (session.import_key, session.media_type),
+                    )
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO generations VALUES (?, ?, ?)",
+                        (session.import_key, session.media_type, generation),
+                    )
+                else:
+                    self._db.executemany(
+                        "DELETE FROM fingerprints WHERE import = ? AND mediatype = ? AND id = ?",
+                        [(session.import_key, session.media_type, item_id) for item_id in session.removed_ids()],
+                    )
+
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (session.import_key, session.media_type, item_id, digest, path)
+                        for (item_id, digest, path) in fingerprints
+                    ],
+                )
+
+        log(f"{len(fingerprints)} fingerprints of {session.media_type} items stored", xbmc.LOGDEBUG)
+
+    def clear(self, import_key: str):
+        with self._lock:
+            self._open()
+
+            with self._db:
+                self._db.execute("DELETE FROM fingerprints WHERE import = ?", (import_key,))
+                self._db.execute("DELETE FROM generations WHERE import = ?", (import_key,))
+
+    def _get_generation(self, import_key: str, media_type: str) -> str:
+        row = self._db.execute(
+            "SELECT generation FROM generations WHERE import = ? AND mediatype = ?", (import_key, media_type)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _open(self):
+        if self._db:
+            return
+
+        self._db = sqlite3.connect(get_profile_path(self._filename), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            "import TEXT, mediatype TEXT, id TEXT, digest TEXT, path TEXT, PRIMARY KEY (import, mediatype, id))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            "import TEXT, mediatype TEXT, generation TEXT, PRIMARY KEY (import, mediatype))"
+        )
+        self._db.commit()
+
+
+# digests of the imported items per media import to skip unchanged items
+fingerprint_store = FingerprintStore("fingerprints.db")
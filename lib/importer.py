@@ -6,16 +6,28 @@
 #  See LICENSES/README.md for more information.
 #
 
-import sys
-from typing import Dict, List
+from datetime import datetime, timedelta
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple
 
 from six.moves.urllib.parse import parse_qs, unquote, urlparse
 
 import xbmc  # pylint: disable=import-error
 import xbmcmediaimport  # pylint: disable=import-error
 
-from lib.kodi import Api  # noqa F401
-from lib.utils import localize, log, provider2str
+from lib.settings import ImportSettings, ProviderSettings
+from lib.utils import batch, import2str, localize, log, provider2str, utc
+from lib.validation_cache import ValidationCache, validation_cache
+
+# xbmcgui is only needed for type hints
+if TYPE_CHECKING:
+    import xbmcgui  # pylint: disable=import-error
+
+# maximum number of items passed to Kodi at once during an import
+IMPORT_BATCH_SIZE = 500
+# the sync cursor is compared with modification times on the media provider (i.e. using its clock) so it is moved
+# back to not lose any changes due to clock skew between Kodi and the media provider
+SYNC_CURSOR_OVERLAP = timedelta(minutes=10)
 
 
 def media_types_from_options(options: Dict) -> List[str]:
@@ -41,13 +53,35 @@ def test_authentication(handle, _):
     log(f"testing authentication with {provider2str(media_provider)}...")
 
     # TODO(stub): check if authentication with the media provider works
+    #             use lib.client.ProviderClient.for_provider(media_provider) to talk to the media provider
     #             feel free to use a dialog to report success / failure
 
 
 def force_sync(handle, _):
-    # TODO(stub): provide custom action setting handlers / callbacks
+    # retrieve the media import
+    media_import = xbmcmediaimport.getImport(handle)
+    if not media_import:
+        log("cannot retrieve media import", xbmc.LOGERROR)
+        return
 
-    pass
+    # prepare and get the media import settings
+    import_settings = media_import.prepareSettings()
+    if not import_settings:
+        log("cannot prepare media import settings", xbmc.LOGERROR)
+        return
+
+    # reset the sync cursor and forget about cached responses to force a full synchronisation during the next import
+    # the fingerprints of the imported items are kept so that the full import only passes added, changed and
+    # removed items to Kodi
+    ImportSettings.reset_sync_cursor(import_settings)
+
+    media_provider = media_import.getProvider()
+    if media_provider:
+        from lib.response_cache import response_cache  # pylint: disable=import-outside-toplevel
+
+        response_cache.clear(media_provider.getIdentifier())
+
+    log(f"full synchronisation of {import2str(media_import)} forced")
 
 
 def setting_options_filler_views(handle, _):
@@ -64,13 +98,22 @@ def setting_options_filler_views(handle, _):
         return
 
     # prepare the media provider settings
-    if not media_provider.prepareSettings():
+    provider_settings = media_provider.prepareSettings()
+    if not provider_settings:
         log("cannot prepare media provider settings", xbmc.LOGERROR)
         return
 
-    # TODO(stub): collect information and provide it as a list of options to the user
-    #             each option is a tuple(label, key)
-    options = [("Foo", "foo"), ("Bar", "bar")]
+    # check if the options have already been collected for the current settings
+    provider_id = media_provider.getIdentifier()
+    fingerprint = ProviderSettings.get_fingerprint(provider_settings)
+    options = validation_cache.get(provider_id, ValidationCache.CHECK_VIEWS, fingerprint)
+    if options is None:
+        # TODO(stub): collect information and provide it as a list of options to the user
+        #             each option is a tuple(label, key)
+        #             use lib.response_cache.response_cache.fetch() to retrieve listings which support revalidation
+        options = [("Foo", "foo"), ("Bar", "bar")]
+
+        validation_cache.set(provider_id, ValidationCache.CHECK_VIEWS, fingerprint, options)
 
     # get the import"s settings
     settings = media_import.getSettings()
@@ -101,9 +144,22 @@ def lookup_provider(handle, _):
         log("cannot prepare media provider settings", xbmc.LOGERROR)
         return
 
+    # check if the media provider has recently been found with the current settings
+    provider_id = media_provider.getIdentifier()
+    fingerprint = ProviderSettings.get_fingerprint(settings)
+    if validation_cache.get(provider_id, ValidationCache.CHECK_PROVIDER_FOUND, fingerprint):
+        xbmcmediaimport.setProviderFound(handle, True)
+        return
+
     # TODO(stub): check if the media provider is active
+    #             use lib.client.ProviderClient.for_provider(settings) to talk to the media provider
+    provider_found = True
+
+    # only remember a found media provider because it might become available at any time
+    if provider_found:
+        validation_cache.set(provider_id, ValidationCache.CHECK_PROVIDER_FOUND, fingerprint, provider_found)
 
-    xbmcmediaimport.setProviderFound(handle, True)
+    xbmcmediaimport.setProviderFound(handle, provider_found)
 
 
 def can_import(handle, options):
@@ -128,14 +184,23 @@ def is_provider_ready(handle, _):
         return
 
     # prepare the media provider settings
-    if not media_provider.prepareSettings():
+    provider_settings = media_provider.prepareSettings()
+    if not provider_settings:
         log("cannot prepare media provider settings", xbmc.LOGERROR)
         xbmcmediaimport.setProviderReady(handle, False)
         return
 
-    # TODO(stub): check if the configuration of the media provider is valid / complete
+    # check if the media provider has already been checked with the current settings
+    provider_id = media_provider.getIdentifier()
+    fingerprint = ProviderSettings.get_fingerprint(provider_settings)
+    provider_ready = validation_cache.get(provider_id, ValidationCache.CHECK_PROVIDER_READY, fingerprint)
+    if provider_ready is None:
+        # TODO(stub): check if the configuration of the media provider is valid / complete
+        provider_ready = True
+
+        validation_cache.set(provider_id, ValidationCache.CHECK_PROVIDER_READY, fingerprint, provider_ready)
 
-    xbmcmediaimport.setProviderReady(handle, True)
+    xbmcmediaimport.setProviderReady(handle, provider_ready)
 
 
 def is_import_ready(handle, _):
@@ -161,14 +226,24 @@ def is_import_ready(handle, _):
         return
 
     # prepare the media provider settings
-    if not media_provider.prepareSettings():
+    provider_settings = media_provider.prepareSettings()
+    if not provider_settings:
         log("cannot prepare media provider settings", xbmc.LOGERROR)
         xbmcmediaimport.setImportReady(handle, False)
         return
 
-    # TODO(stub): check if the configuration of the media import is valid / complete
+    # check if the media import has already been checked with the current settings
+    provider_id = media_provider.getIdentifier()
+    check = f"{ValidationCache.CHECK_IMPORT_READY}{media_import.getMediaTypes()}"
+    fingerprint = ProviderSettings.get_fingerprint(provider_settings) + ImportSettings.get_fingerprint(import_settings)
+    import_ready = validation_cache.get(provider_id, check, fingerprint)
+    if import_ready is None:
+        # TODO(stub): check if the configuration of the media import is valid / complete
+        import_ready = True
+
+        validation_cache.set(provider_id, check, fingerprint, import_ready)
 
-    xbmcmediaimport.setImportReady(handle, True)
+    xbmcmediaimport.setImportReady(handle, import_ready)
 
 
 def load_provider_settings(handle, _):
@@ -183,6 +258,9 @@ def load_provider_settings(handle, _):
         log("cannot retrieve media provider settings", xbmc.LOGERROR)
         return
 
+    # the settings are about to be changed so forget about any cached checks
+    validation_cache.invalidate(media_provider.getIdentifier())
+
     # TODO(stub): register action callbacks
     settings.registerActionCallback("stub.testauthentication", "testauthentication")
 
@@ -203,6 +281,11 @@ def load_import_settings(handle, _):
         log("cannot retrieve media import settings", xbmc.LOGERROR)
         return
 
+    # the settings are about to be changed so forget about any cached checks
+    media_provider = media_import.getProvider()
+    if media_provider:
+        validation_cache.invalidate(media_provider.getIdentifier())
+
     # TODO(stub): register action callbacks
     settings.registerActionCallback("stub.forcesync", "forcesync")
 
@@ -232,8 +315,145 @@ def can_update_resume_position_on_provider(handle, options):  # pylint: disable=
     xbmcmediaimport.setCanUpdateResumePositionOnProvider(handle, True)
 
 
+# pylint: disable=unused-argument
+def _fetch_item_objs_page(
+    media_provider: xbmcmediaimport.MediaProvider,
+    import_settings,
+    media_type: str,
+    index: int,
+    sync_cursor: datetime = None,
+) -> List[Tuple[int, Dict]]:
+    # TODO(stub): use lib.client.ProviderClient.for_provider(media_provider) to talk to the media provider
+    #             and lib.response_cache.response_cache.fetch() to retrieve listings which support revalidation
+    # TODO(stub): return an empty page once the page index is beyond the last page
+    if not sync_cursor:
+        # TODO(stub): retrieve the page with the given index of all items of the given media type
+        return [(xbmcmediaimport.MediaImportChangesetTypeNone, item_obj) for item_obj in ()]
+
+    # TODO(stub): only retrieve the page with the given index of the items of the given media type which have been
+    #             added, changed or removed on the media provider since the given sync cursor together with one of
+    #             (items changed shortly before the last import are retrieved again due to SYNC_CURSOR_OVERLAP):
+    #     xbmcmediaimport.MediaImportChangesetTypeAdded: the item is new and should be added
+    #     xbmcmediaimport.MediaImportChangesetTypeChanged: the item has been imported before and has changed
+    #     xbmcmediaimport.MediaImportChangesetTypeRemoved: the item has to be removed
+    return []
+
+
+def _retrieve_item_objs(
+    task, media_provider: xbmcmediaimport.MediaProvider, import_settings, media_type: str, sync_cursor: datetime = None
+) -> Iterator[Tuple[int, Dict]]:
+    from lib.pipeline import PagePrefetcher  # pylint: disable=import-outside-toplevel
+
+    # TODO(stub): report the total number of items as soon as it is known using task.set_total()
+    # TODO(stub): media providers which return all items in a single (huge) response can stream the item objects
+    #             using ProviderClient.for_provider(media_provider).get_json_items(path, items_key=...)
+    #             instead of retrieving them page by page
+    # retrieve the next pages while the items of the current page are being converted and passed to Kodi
+    # and stop retrieving pages as soon as the import is cancelled
+    pages = PagePrefetcher(
+        partial(_fetch_item_objs_page, media_provider, import_settings, media_type, sync_cursor=sync_cursor),
+        cancelled=task.cancelled,
+    )
+    for page in pages:
+        yield from page
+
+
+def _convert_item_objs(
+    task, item_objs: Iterable[Tuple[int, Dict]], media_type: str, fingerprints=None, path_mapper=None
+) -> Iterator[List[Tuple[int, "xbmcgui.ListItem"]]]:
+    from lib.kodi import Api  # pylint: disable=import-outside-toplevel
+
+    # convert the items page by page so that repeated values can be shared between the items of a page
+    for page in batch(item_objs, IMPORT_BATCH_SIZE):
+        if task.cancelled():
+            return
+
+        page_changeset_types = []
+        page_item_ids = []
+        page_item_objs = []
+        for changeset_type, item_obj in page:
+            item_id = None
+            if fingerprints:
+                item_id = Api.get_id_from_item_obj(item_obj)
+                if changeset_type == xbmcmediaimport.MediaImportChangesetTypeRemoved:
+                    fingerprints.remove(item_id)
+                else:
+                    # skip items which haven't changed since the last import before converting them
+                    changeset_type = fingerprints.process(changeset_type, item_id, item_obj)
+                    if changeset_type is None:
+                        continue
+
+            page_changeset_types.append(changeset_type)
+            page_item_ids.append(item_id)
+            page_item_objs.append(item_obj)
+
+        # TODO(stub): adjust lib.kodi.Api.to_file_item()
+        page_items = Api.to_file_items(page_item_objs, media_type, path_mapper=path_mapper)
+
+        items = []
+        for changeset_type, item_id, item in zip(page_changeset_types, page_item_ids, page_items):
+            if not item:
+                continue
+
+            if fingerprints:
+                fingerprints.set_path(item_id, item.getPath())
+
+            items.append((changeset_type, item))
+
+        yield items
+
+    # items which have been imported before but haven't been retrieved anymore have been removed
+    if fingerprints and not task.cancelled():
+        removed_items = (
+            (xbmcmediaimport.MediaImportChangesetTypeRemoved, Api.to_removed_file_item(item_id, path, media_type))
+            for (item_id, path) in fingerprints.removed()
+        )
+        yield from batch(removed_items, IMPORT_BATCH_SIZE)
+
+
+# pylint: disable=too-many-arguments
+def _produce_items(
+    media_provider: xbmcmediaimport.MediaProvider,
+    import_settings,
+    media_type: str,
+    task,
+    sync_cursor: datetime = None,
+    fingerprints=None,
+    path_mapper=None,
+) -> Iterator[List[Tuple[int, "xbmcgui.ListItem"]]]:
+    # retrieve the items page by page and convert them into ListItems
+    item_objs = _retrieve_item_objs(task, media_provider, import_settings, media_type, sync_cursor=sync_cursor)
+
+    return _convert_item_objs(task, item_objs, media_type, fingerprints=fingerprints, path_mapper=path_mapper)
+
+
+def _add_import_items(handle, items: List[Tuple[int, "xbmcgui.ListItem"]], media_type: str):
+    # group the items by their changeset type
+    changesets = {}
+    for changeset_type, item in items:
+        changesets.setdefault(changeset_type, []).append(item)
+
+    for changeset_type, changeset_items in changesets.items():
+        xbmcmediaimport.addImportItems(handle, changeset_items, media_type, changeset_type)
+
+
+def _import_progress(items: int, total: int, media_type_index: int, media_types: int) -> Tuple[int, int]:
+    # report the progress per item if the media providers have reported the total number of items
+    # otherwise report the progress per media type instead of pretending that all items have already been imported
+    if 0 < total and items <= total:
+        return (items, total)
+
+    return (media_type_index, media_types)
+
+
 # noqa pylint: disable=too-many-locals, too-many-statements, too-many-nested-blocks, too-many-branches, too-many-return-statements
 def exec_import(handle, options):
+    # pylint: disable=import-outside-toplevel
+    from lib.fingerprints import FingerprintStore, fingerprint_store
+    from lib.path_mapping import PathMapper
+    from lib.pipeline import CancellationCheck, ImportPipeline
+    from lib.response_cache import response_cache
+
     # parse all necessary options
     media_types = media_types_from_options(options)
     if not media_types:
@@ -258,49 +478,118 @@ def exec_import(handle, options):
         log("cannot retrieve media provider", xbmc.LOGERROR)
         return
 
-    log(f"importing {media_types} items from { provider2str(media_provider)}...")
-
-    # TODO(stub): prepare collecting ListItems
-
-    # loop over all media types to be imported
-    progress = 0
-    progress_total = len(media_types)
-    for media_type in media_types:
-        # check if we need to cancel importing items
-        if xbmcmediaimport.shouldCancel(handle, progress, progress_total):
-            return
-        progress += 1
-
-        log(f"importing {media_type} items from {provider2str(media_provider)}...")
-
-        # report the progress status
-        xbmcmediaimport.setProgressStatus(handle, localize(32001).format(media_type))
-
-        items = []
-
-        # TODO(stub): collect ListItems to import
-        #             adjust and use lib.kodi.Api.to_file_item()
+    # prepare the media provider settings
+    if not media_provider.prepareSettings():
+        log("cannot prepare media provider settings", xbmc.LOGERROR)
+        return
 
-        if items:
-            # pass the imported items back to Kodi
-            log(f"{len(items)} {media_type} items imported from {provider2str(media_provider)}")
+    # only items changed since the last import have to be imported unless there is no (valid) sync cursor
+    sync_cursor = ImportSettings.get_sync_cursor(import_settings)
+    partial_import = sync_cursor is not None
+    # the start of this import will be the sync cursor of the next import
+    # TODO(stub): prefer the clock of the media provider (e.g. the "Date" header of its responses or the latest
+    #             modification time of the retrieved items) if it is available
+    next_sync_cursor = datetime.now(utc) - SYNC_CURSOR_OVERLAP
+
+    # a full import only has to pass added, changed and removed items to Kodi if the fingerprints of the items
+    # imported by the last full import of all media types into this media import are known
+    import_key = FingerprintStore.get_import_key(media_import)
+    generation = ImportSettings.get_fingerprint_generation(import_settings)
+    skip_unchanged = not partial_import and all(
+        fingerprint_store.has_fingerprints(import_key, media_type, generation) for media_type in media_types
+    )
+    # changed path substitutions change the paths of all items
+    path_substitutions = ProviderSettings.get_path_substitutions(media_provider)
+    path_mapper = PathMapper(path_substitutions)
+    fingerprints = {
+        media_type: fingerprint_store.begin(import_key, media_type, skip_unchanged, salt=str(path_substitutions))
+        for media_type in media_types
+    }
+
+    if partial_import:
+        log(f"importing {media_types} items changed since {sync_cursor} from {provider2str(media_provider)}...")
+    elif skip_unchanged:
+        log(f"importing {media_types} items changed since the last import from {provider2str(media_provider)}...")
+    else:
+        log(f"importing {media_types} items from { provider2str(media_provider)}...")
+
+    with ImportPipeline() as pipeline:
+        # retrieve and convert the items of all media types concurrently
+        for media_type in media_types:
+            pipeline.submit(
+                media_type,
+                partial(
+                    _produce_items,
+                    media_provider,
+                    import_settings,
+                    media_type,
+                    sync_cursor=sync_cursor,
+                    fingerprints=fingerprints[media_type],
+                    path_mapper=path_mapper,
+                ),
+            )
+
+        # loop over all media types to be imported and pass their items to Kodi in order
+        progress = 0
+        should_cancel = CancellationCheck(partial(xbmcmediaimport.shouldCancel, handle))
+        for index, media_type in enumerate(media_types):
+            # check if we need to cancel importing items
+            if should_cancel(*_import_progress(progress, pipeline.total(), index, len(media_types)), force=True):
+                pipeline.cancel()
+                return
+
+            log(f"importing {media_type} items from {provider2str(media_provider)}...")
+
+            # report the progress status
+            xbmcmediaimport.setProgressStatus(handle, localize(32001).format(media_type))
+
+            # pass the imported items back to Kodi in batches
+            items_imported = 0
+            for items_batch in pipeline.results(media_type):
+                # check if we need to cancel importing items and report the progress
+                if should_cancel(*_import_progress(progress, pipeline.total(), index, len(media_types))):
+                    pipeline.cancel()
+                    return
+
+                if not items_batch:
+                    continue
+
+                _add_import_items(handle, items_batch, media_type)
+                items_imported += len(items_batch)
+                progress += len(items_batch)
+
+            if items_imported:
+                log(f"{items_imported} {media_type} items imported from {provider2str(media_provider)}")
+
+    log(
+        f"checked {should_cancel.checks} times for cancellation during import taking {should_cancel.duration:.3f}s",
+        xbmc.LOGDEBUG,
+    )
+    log(f"response cache statistics: {response_cache.stats()}", xbmc.LOGDEBUG)
 
-            # TODO(stub): for partial imports use the following constants as an optional fourth argument:
-            #     xbmcmediaimport.MediaImportChangesetTypeNone: let Kodi decide
-            #     xbmcmediaimport.MediaImportChangesetTypeAdded: the item is new and should be added
-            #     xbmcmediaimport.MediaImportChangesetTypeChanged: the item has been imported before and has changed
-            #     xbmcmediaimport.MediaImportChangesetTypeRemoved: the item has to be removed
-            xbmcmediaimport.addImportItems(handle, items, media_type)
+    # finish the import
+    xbmcmediaimport.finishImport(handle, partial_import or skip_unchanged)
 
-    # TODO(stub): tell Kodi whether the provided items is a full or partial import
-    partial_import = False
+    # remember the fingerprints of the imported items for the next full import
+    # a full import starts a new generation of fingerprints which is only stored in the media import's settings
+    # after the fingerprints have been stored
+    if not partial_import or not generation:
+        generation = FingerprintStore.new_generation()
+    for media_type in media_types:
+        fingerprint_store.commit(fingerprints[media_type], not partial_import, generation)
+    ImportSettings.set_fingerprint_generation(import_settings, generation, save=False)
 
-    # finish the import
-    xbmcmediaimport.finishImport(handle, partial_import)
+    # remember the sync cursor for the next import
+    ImportSettings.set_sync_cursor(import_settings, next_sync_cursor)
 
 
 # pylint: disable=too-many-return-statements
 def update_on_provider(handle, _):
+    # pylint: disable=import-outside-toplevel
+    from lib.client import ProviderClient
+    from lib.kodi import Api
+    from lib.update_queue import PlaybackUpdate, update_queue
+
     # retrieve the media import
     media_import = xbmcmediaimport.getImport(handle)
     if not media_import:
@@ -337,11 +626,44 @@ def update_on_provider(handle, _):
         log("updated item is not a video item", xbmc.LOGERROR)
         return
 
-    # TODO(stub): update playback related metadata (playcount, last played, resume point)
+    item_id = Api.get_id_from_video_info_tag(video_info_tag)
+    if not item_id:
+        log(f'cannot determine the identifier of "{item.getLabel()}" ({item.getPath()})', xbmc.LOGERROR)
+        return
+
+    # TODO(stub): adjust the playback related metadata (playcount, last played, resume point) to update
+    update = PlaybackUpdate(
+        item_id,
+        video_info_tag.getPlayCount(),
+        video_info_tag.getLastPlayed(),
+        video_info_tag.getResumeTime(),
+        video_info_tag.getResumeTimeTotal(),
+    )
+
+    # the media provider's settings (e.g. its URL) might be missing or invalid
+    try:
+        url = ProviderSettings.get_url(media_provider)
+    except RuntimeError as e:
+        log(f"cannot update items on {provider2str(media_provider)}: {e}", xbmc.LOGERROR)
+        return
+
+    # persist the update before talking to the media provider so that it can be replayed if anything below fails
+    sequence = update_queue.persist(url, update)
+
+    try:
+        client = ProviderClient.for_provider(media_provider)
+    except (RuntimeError, ValueError) as e:
+        log(f"cannot update items on {provider2str(media_provider)}: {e}", xbmc.LOGERROR)
+        return
+
+    # queue the update so that bursts of updates (e.g. marking a whole season as watched) are sent in bulk
+    update_queue.enqueue(client, update, sequence=sequence)
 
     xbmcmediaimport.finishUpdate_on_provider(handle)
 
 
+# only import modules which are needed by all actions at the top level. any modules which are only needed by
+# specific actions (e.g. lib.kodi or lib.pipeline) must be imported by those actions to keep the startup fast
 ACTIONS = {
     # official media import callbacks
     # mandatory
@@ -372,6 +694,7 @@ def run(argv):
     handle = int(argv[1])
 
     options = None
+    params = ""
     if len(argv) > 2:
         # get the options but remove the leading ?
         params = argv[2][1:]
@@ -387,12 +710,12 @@ def run(argv):
 
     if action not in ACTIONS:
         log(f"cannot process unknown action: {action}", xbmc.LOGERROR)
-        sys.exit(0)
+        return
 
     action_method = ACTIONS[action]
     if not action_method:
         log(f"action not implemented: {action}", xbmc.LOGWARNING)
-        sys.exit(0)
+        return
 
     log(f'executing action "{action}"...', xbmc.LOGDEBUG)
     action_method(handle, options)
@@ -0,0 +1,167 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+import codecs
+import json
+from typing import Dict, Iterable, Iterator
+import zlib
+
+WHITESPACE = " \t\n\r"
+# characters which can follow a value inside of an array or object
+DELIMITERS = WHITESPACE + ",]}"
+
+
+class _Decompressor:  # pylint: disable=too-few-public-methods
+    def __init__(self, content_encoding: str):
+        content_encoding = (content_encoding or "identity").strip().lower()
+        if content_encoding not in ("gzip", "deflate", "identity"):
+            raise ValueError(f"unsupported content encoding {content_encoding}")
+
+        self._content_encoding = content_encoding
+        self._decompressor = None
+        if content_encoding == "gzip":
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        # start of deflate data until it is known whether it contains a zlib header
+        self._header = b""
+
+    def decompress(self, data: bytes, final: bool = False) -> bytes:
+        if self._content_encoding == "identity":
+            return data
+
+        if not self._decompressor:
+            self._header += data
+            if len(self._header) < 2 and not final:
+                return b""
+
+            # some servers send raw deflate data without the zlib header
+            (cmf, flg) = (self._header + b"\0\0")[:2]
+            if cmf & 0x0F == 8 and (cmf * 256 + flg) % 31 == 0:
+                self._decompressor = zlib.decompressobj(zlib.MAX_WBITS)
+            else:
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+
+            (data, self._header) = (self._header, b"")
+
+        decompressed = self._decompressor.decompress(data)
+        if final:
+            decompressed += self._decompressor.flush()
+
+        return decompressed
+
+
+class _Reader:
+    # minimum number of characters to read before trying to decode again
+    MIN_READ_SIZE = 16 * 1024
+
+    def __init__(self, chunks: Iterable[bytes], content_encoding: str = None):
+        self._chunks = iter(chunks)
+        self._decompressor = _Decompressor(content_encoding)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._decoder_json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def peek(self) -> str:
+        # returns the next non-whitespace character without consuming it or "" at the end of the data
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE:
+                self._pos += 1
+
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                return ""
+
+    def expect(self, expected: str):
+        char = self.peek()
+        if char != expected:
+            raise ValueError(f"invalid JSON: expected {expected!r} but got {char!r}")
+
+        self._pos += 1
+
+    def decode(self):
+        self.peek()
+
+        # a value can span multiple chunks so retry decoding after reading more data
+        while True:
+            try:
+                (value, end) = self._decoder_json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._read():
+                    raise
+                continue
+
+            # numbers might continue in the next chunk
+            if (
+                not isinstance(value, (dict, list, str))
+                and (end == len(self._buffer) or self._buffer[end] not in DELIMITERS)
+                and self._read()
+            ):
+                continue
+
+            self._pos = end
+            return value
+
+    def _read(self) -> bool:
+        if self._eof:
+            return False
+
+        # only keep the part of the buffer which hasn't been consumed yet
+        texts = [self._buffer[self._pos :]]
+        self._pos = 0
+
+        read = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(self._decompressor.decompress(chunk))
+            texts.append(text)
+            read += len(text)
+            if read >= _Reader.MIN_READ_SIZE:
+                break
+        else:
+            self._eof = True
+            text = self._decoder.decode(self._decompressor.decompress(b"", final=True), final=True)
+            texts.append(text)
+            read += len(text)
+
+        self._buffer = "".join(texts)
+        return read > 0
+
+
+def iter_json_items(chunks: Iterable[bytes], items_key: str = None, content_encoding: str = None) -> Iterator[Dict]:
+    # yields the items of a JSON array one at a time while the chunks of the JSON document are being received
+    # the array is either the JSON document itself or the value of items_key in the top-level JSON object
+    reader = _Reader(chunks, content_encoding=content_encoding)
+
+    if items_key:
+        # skip all other values of the top-level object until the array of items
+        reader.expect("{")
+        while True:
+            key = reader.decode()
+            reader.expect(":")
+            if key == items_key:
+                break
+
+            reader.decode()
+            if reader.peek() != ",":
+                # the top-level object doesn't contain any items
+                reader.expect("}")
+                return
+            reader.expect(",")
+
+    reader.expect("[")
+    if reader.peek() == "]":
+        return
+
+    while True:
+        yield reader.decode()
+
+        if reader.peek() == "]":
+            return
+        reader.expect(",")
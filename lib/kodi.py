@@ -6,31 +6,87 @@
 #  See LICENSES/README.md for more information.
 #
 
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
 import json
-from typing import Dict, List
-
-from dateutil import parser
-from six.moves.urllib.parse import urlparse, urlunparse
+import re
+from typing import Dict, Iterable, List
 
 import xbmc  # pylint: disable=import-error
 from xbmcgui import InfoTagVideo, ListItem  # pylint: disable=import-error
 import xbmcmediaimport  # pylint: disable=import-error
 
+from lib.path_mapping import PathMapper
+
 
 class Api:
+    # media type => JSON-RPC method (VideoLibrary.Get<method>Details / VideoLibrary.Get<method>s)
+    JSONRPC_METHODS = {
+        xbmcmediaimport.MediaTypeMovie: "Movie",
+        xbmcmediaimport.MediaTypeTvShow: "TVShow",
+        xbmcmediaimport.MediaTypeEpisode: "Episode",
+        xbmcmediaimport.MediaTypeMusicVideo: "MusicVideo",
+    }
+
+    # maps paths without any substitutions
+    DEFAULT_PATH_MAPPER = PathMapper()
+
+    # ISO 8601 / RFC 3339 date (and time) as usually provided by media providers
+    ISO8601_DATETIME = re.compile(
+        r"(\d{4})-(\d{2})-(\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,]\d+)?)?(?:Z|[+-](\d{2}):?(\d{2}))?)?"
+    )
+
     @staticmethod
+    @lru_cache(maxsize=1024)
     def convert_datetime2db_datetime(datetime_str: str) -> str:
         if not datetime_str:
             return ""
 
-        datetime = parser.parse(datetime_str)
+        # avoid the expensive generic parser for the common ISO 8601 formats
+        date_time = Api._parse_iso8601_datetime(datetime_str)
+        if not date_time:
+            from dateutil import parser  # pylint: disable=import-outside-toplevel
+
+            date_time = parser.parse(datetime_str)
+
         try:
-            return datetime.strftime("%Y-%m-%d %H:%M:%S")
+            return date_time.strftime("%Y-%m-%d %H:%M:%S")
         except ValueError:
             return ""
 
     @staticmethod
-    def get_id_from_item(local_item: ListItem) -> str:
+    def _parse_iso8601_datetime(datetime_str: str) -> datetime:
+        match = Api.ISO8601_DATETIME.fullmatch(datetime_str)
+        if not match:
+            return None
+
+        (year, month, day, hour, minute, second, offset_hours, offset_minutes) = match.groups()
+
+        # leave invalid timezone offsets to the generic parser
+        if offset_hours and (int(offset_hours) > 23 or int(offset_minutes) > 59):
+            return None
+
+        # the timezone offset doesn't change the formatted date and time so it can be ignored
+        try:
+            return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+        except ValueError:
+            return None
+
+    class UniqueIdIndex:
+        def __init__(self):
+            # media type => (database ID => unique IDs)
+            self._unique_ids = {}
+
+        def get(self, media_type: str, db_id: int) -> Dict[str, str]:
+            # retrieve the unique IDs of all items of the media type with a single JSON-RPC request
+            if media_type not in self._unique_ids:
+                self._unique_ids[media_type] = Api._retrieve_unique_ids(media_type)
+
+            return self._unique_ids[media_type].get(db_id)
+
+    @staticmethod
+    def get_id_from_item(local_item: ListItem, unique_id_index: "Api.UniqueIdIndex" = None) -> str:
         if not local_item:
             raise ValueError("invalid localItem")
 
@@ -38,11 +94,11 @@ class Api:
         if not video_info_tag:
             return None
 
-        return Api.get_id_from_video_info_tag(video_info_tag)
+        return Api.get_id_from_video_info_tag(video_info_tag, unique_id_index=unique_id_index)
 
     @staticmethod
     # pylint: disable=too-many-return-statements
-    def get_id_from_video_info_tag(video_info_tag: InfoTagVideo) -> str:
+    def get_id_from_video_info_tag(video_info_tag: InfoTagVideo, unique_id_index: "Api.UniqueIdIndex" = None) -> str:
         UNIQUE_ID = "stub"
 
         if not video_info_tag:
@@ -59,37 +115,28 @@ class Api:
             return None
 
         media_type = video_info_tag.getMediaType()
-        if media_type == xbmcmediaimport.MediaTypeMovie:
-            method = "Movie"
-        elif media_type == xbmcmediaimport.MediaTypeTvShow:
-            method = "TVShow"
-        elif media_type == xbmcmediaimport.MediaTypeEpisode:
-            method = "Episode"
-        elif media_type == xbmcmediaimport.MediaTypeMusicVideo:
-            method = "MusicVideo"
-        else:
+        if media_type not in Api.JSONRPC_METHODS:
             return None
 
+        # use the prefetched unique IDs if available
+        if unique_id_index:
+            json_unique_ids = unique_id_index.get(media_type, db_id)
+            if not json_unique_ids or UNIQUE_ID not in json_unique_ids:
+                return None
+
+            return json_unique_ids[UNIQUE_ID]
+
         # use JSON-RPC to retrieve all unique IDs
-        json_response = json.loads(
-            xbmc.executeJSONRPC(
-                json.dumps(
-                    {
-                        "jsonrpc": "2.0",
-                        "method": f"VideoLibrary.Get{method}Details",
-                        "params": {
-                            f"{media_type}id": db_id,
-                            "properties": ["uniqueid"],
-                        },
-                        "id": 0,
-                    }
-                )
-            )
+        json_result = Api._execute_jsonrpc(
+            f"VideoLibrary.Get{Api.JSONRPC_METHODS[media_type]}Details",
+            {
+                f"{media_type}id": db_id,
+                "properties": ["uniqueid"],
+            },
         )
-        if not json_response or "result" not in json_response:
+        if not json_result:
             return None
 
-        json_result = json_response["result"]
         details_key = f"{media_type}details"
         if details_key not in json_result:
             return None
@@ -104,43 +151,141 @@ class Api:
 
         return json_unique_ids[UNIQUE_ID]
 
+    @staticmethod
+    def get_id_from_item_obj(item_obj: Dict) -> str:
+        if not item_obj:
+            raise ValueError("invalid item_obj")
+
+        # TODO(stub): get the item's identifier on the media provider
+        return item_obj.get("id")
+
+    @staticmethod
+    def to_removed_file_item(item_id: str, path: str, media_type: str) -> ListItem:
+        # only the path and the unique ID are needed to remove a previously imported item
+        item = ListItem(path=path, offscreen=True)
+        item.setInfo("video", {"mediatype": media_type, "path": path, "filenameandpath": path})
+        # TODO(stub): use the same unique ID as Api.fill_video_infos()
+        item.getVideoInfoTag().setUniqueIDs({"stub": item_id}, "stub")
+
+        return item
+
     @staticmethod
     def match_imported_item_ids_to_local_items(local_items: List[ListItem], *imported_item_id_lists):
+        # prefetch the unique IDs of local items without a specific identifier per media type
+        unique_id_index = Api.UniqueIdIndex()
+
         matched_item_lists = []
+        # count how often every imported item ID still has to be matched
         item_ids_to_process_lists = []
+        items_to_process = 0
         for imported_item_ids in imported_item_id_lists:
             matched_item_lists.append([])
-            item_ids_to_process_lists.append(imported_item_ids.copy())
+            item_ids_to_process_lists.append(Counter(imported_item_ids))
+            items_to_process += len(imported_item_ids)
 
         for local_item in local_items:
             # abort if there are no more items to process
-            if all(len(item_ids_to_process) == 0 for item_ids_to_process in item_ids_to_process_lists):
+            if not items_to_process:
                 break
 
             # retrieve the local item"s ID
-            local_item_id = Api.get_id_from_item(local_item)
+            local_item_id = Api.get_id_from_item(local_item, unique_id_index=unique_id_index)
             if not local_item_id:
                 continue
 
             # check if it matches one of the imported item IDs
-            for index, imported_item_ids in enumerate(imported_item_id_lists):
-                if local_item_id not in item_ids_to_process_lists[index]:
+            for index, item_ids_to_process in enumerate(item_ids_to_process_lists):
+                if item_ids_to_process[local_item_id] <= 0:
                     continue
 
                 matched_item_lists[index].append(local_item)
-                item_ids_to_process_lists[index].remove(local_item_id)
+                item_ids_to_process[local_item_id] -= 1
+                items_to_process -= 1
 
         return tuple(matched_item_lists)
 
+    class Interner:
+        # info keys whose values are usually shared by a lot of items (e.g. genres, studios or MPAA ratings)
+        INTERNED_INFO_KEYS = frozenset(
+            (
+                "mpaa",
+                "director",
+                "writer",
+                "artist",
+                "album",
+                "genre",
+                "country",
+                "studio",
+                "tag",
+                "tvshowtitle",
+                "status",
+            )
+        )
+
+        def __init__(self):
+            # value => canonical instance of the value (lists are stored by their items)
+            self._values = {}
+
+        def intern(self, value):
+            # interned lists are shared between items and must not be modified
+            if isinstance(value, list):
+                try:
+                    key = tuple(value)
+                    shared = self._values.get(key)
+                except TypeError:
+                    return value
+
+                if shared is None:
+                    shared = [self.intern(list_value) for list_value in value]
+                    self._values[key] = shared
+
+                return shared
+
+            if isinstance(value, str):
+                return self._values.setdefault(value, value)
+
+            return value
+
+        def intern_info(self, info: Dict):
+            for key in Api.Interner.INTERNED_INFO_KEYS.intersection(info):
+                info[key] = self.intern(info[key])
+
+    @staticmethod
+    def to_file_items(
+        item_objs: Iterable[Dict], media_type: str, allow_direct_play: bool = True, path_mapper: PathMapper = None
+    ) -> List[ListItem]:
+        # convert a whole page of items at once sharing repeated values between the items of the page
+        # the returned list contains None for every item which cannot be converted
+        interner = Api.Interner()
+
+        return [
+            Api.to_file_item(
+                item_obj,
+                media_type,
+                allow_direct_play=allow_direct_play,
+                interner=interner,
+                path_mapper=path_mapper,
+            )
+            for item_obj in item_objs
+        ]
+
     @staticmethod
     # pylint: disable=too-many-arguments
-    def to_file_item(item_obj: Dict, media_type: str = "", allow_direct_play: bool = True) -> ListItem:
+    def to_file_item(
+        item_obj: Dict,
+        media_type: str = "",
+        allow_direct_play: bool = True,
+        interner: "Api.Interner" = None,
+        path_mapper: PathMapper = None,
+    ) -> ListItem:
         # TODO(stub): check if the media type is supported
 
         # TODO(stub): parse the item's title / label
         label = None
 
         # determine the item's playback URL
+        # TODO(stub): map file paths provided by the media provider using
+        #             Api._map_path(path, container=container, path_mapper=path_mapper)
         item_path = "TODO(stub)"
         if not item_path:
             return None
@@ -154,7 +299,7 @@ class Api:
         #             item.setDateTime(premiereDate)
 
         # fill video details
-        Api.fill_video_infos(item_obj, media_type, item, allow_direct_play=allow_direct_play)
+        Api.fill_video_infos(item_obj, media_type, item, allow_direct_play=allow_direct_play, interner=interner)
 
         # TODO(stub): handle artwork as a dict
         artwork = None
@@ -163,163 +308,283 @@ class Api:
 
         return item
 
-    @staticmethod
-    def fill_video_infos(item_obj: Dict, media_type: str, item: ListItem, allow_direct_play: bool = True):
-        info = {
-            "mediatype": media_type,
-            "path": "TODO(stub)",
-            "filenameandpath": item.getPath(),
-            "title": item.getLabel() or "",
-            "sorttitle": "TODO(stub)",
-            "originaltitle": "TODO(stub)",
-            "plot": Api._map_overview("TODO(stub)"),
-            "plotoutline": "TODO(stub)",
-            "dateadded": Api.convert_datetime2db_datetime("2021-03-14 14:08:00"),  # TODO(stub)
-            "year": 2021,  # TODO(stub)
-            "rating": 0.0,  # TODO(stub)
-            "mpaa": "TODO(stub)",
-            "duration": 0,  # TODO(stub)
-            "playcount": 0,  # TODO(stub)
-            "lastplayed": Api.convert_datetime2db_datetime("2021-03-14 14:08:00"),  # TODO(stub)
-            "director": ["TODO(stub)"],
-            "writer": ["TODO(stub)"],
-            "artist": ["TODO(stub)"],
-            "album": "TODO(stub)",
-            "genre": ["TODO(stub)"],
-            "country": ["TODO(stub)"],
-            "studio": ["TODO(stub)"],
-            "tag": ["TODO(stub)"],
-            "trailer": "TODO(stub)",
-            "tagline": "TODO(stub)",
-        }
-
-        # handle aired / premiered
-        date = item.getDateTime()
-        if date:
-            pos = date.find("T")
-            if pos >= 0:
-                date = date[:pos]
-
-            if media_type == xbmcmediaimport.MediaTypeEpisode:
-                info["aired"] = date
-            else:
-                info["premiered"] = date
-
-        # handle tvshow, season and episode specific properties
-        if media_type == xbmcmediaimport.MediaTypeTvShow:
-            info["tvshowtitle"] = item.getLabel()
-            info["status"] = "TODO(stub)"
-        elif media_type in (
-            xbmcmediaimport.MediaTypeSeason,
-            xbmcmediaimport.MediaTypeEpisode,
-        ):
-            info["tvshowtitle"] = "TODO(stub)"
-            index = 0  # TODO(stub)
-            if media_type == xbmcmediaimport.MediaTypeSeason:
-                info["season"] = index
+    # media types which can be played and therefore have stream details and a resume point
+    PLAYABLE_MEDIA_TYPES = (
+        xbmcmediaimport.MediaTypeMovie,
+        xbmcmediaimport.MediaTypeEpisode,
+        xbmcmediaimport.MediaTypeMusicVideo,
+    )
 
+    @staticmethod
+    def _get_video_info_schema() -> tuple:
+        # (Kodi info key, item object field, converter or None, default value, media types or None for all)
+        # TODO(stub): adjust the item object fields and converters to the ones provided by the media provider
+        return (
+            ("path", "TODO(stub)", None, "", None),
+            (
+                "sorttitle",
+                "TODO(stub)",
+                None,
+                "",
                 # ATTENTION
                 # something is wrong with the SortName property for seasons which interfers with Kodi
                 # abusing sorttitle for custom season titles
-                del info["sorttitle"]
-            else:
-                info["season"] = 0  # TODO(stub)
-                info["episode"] = index
-
-        # handle actors / cast
-        cast = []
-        for index, _ in enumerate("TODO(stub)"):  # TODO(stub)
-            cast.append(
-                {
-                    "name": "TODO(stub)",
-                    "role": "TODO(stub)",
-                    "order": index,
-                    "thumbnail": "TODO(stub)",
-                }
-            )
+                (
+                    xbmcmediaimport.MediaTypeMovie,
+                    xbmcmediaimport.MediaTypeTvShow,
+                    xbmcmediaimport.MediaTypeEpisode,
+                    xbmcmediaimport.MediaTypeMusicVideo,
+                ),
+            ),
+            ("originaltitle", "TODO(stub)", None, "", None),
+            ("plot", "TODO(stub)", Api._map_overview, "", None),
+            ("plotoutline", "TODO(stub)", None, "", None),
+            ("dateadded", "TODO(stub)", Api.convert_datetime2db_datetime, "", None),
+            ("year", "TODO(stub)", int, 0, None),
+            ("rating", "TODO(stub)", float, 0.0, None),
+            ("mpaa", "TODO(stub)", None, "", None),
+            ("duration", "TODO(stub)", int, 0, None),
+            ("playcount", "TODO(stub)", int, 0, None),
+            ("lastplayed", "TODO(stub)", Api.convert_datetime2db_datetime, "", None),
+            ("director", "TODO(stub)", list, [], None),
+            ("writer", "TODO(stub)", list, [], None),
+            ("artist", "TODO(stub)", list, [], None),
+            ("album", "TODO(stub)", None, "", None),
+            ("genre", "TODO(stub)", list, [], None),
+            ("country", "TODO(stub)", list, [], None),
+            ("studio", "TODO(stub)", list, [], None),
+            ("tag", "TODO(stub)", list, [], None),
+            ("trailer", "TODO(stub)", None, "", None),
+            ("tagline", "TODO(stub)", None, "", None),
+            ("status", "TODO(stub)", None, "", (xbmcmediaimport.MediaTypeTvShow,)),
+            (
+                "tvshowtitle",
+                "TODO(stub)",
+                None,
+                "",
+                (xbmcmediaimport.MediaTypeSeason, xbmcmediaimport.MediaTypeEpisode),
+            ),
+            # index of the season
+            ("season", "TODO(stub)", int, 0, (xbmcmediaimport.MediaTypeSeason,)),
+            # index of the season the episode belongs to
+            ("season", "TODO(stub)", int, 0, (xbmcmediaimport.MediaTypeEpisode,)),
+            # index of the episode
+            ("episode", "TODO(stub)", int, 0, (xbmcmediaimport.MediaTypeEpisode,)),
+        )
 
-        # store the collected information in the ListItem
-        item.setInfo("video", info)
-        item.setCast(cast)
+    @staticmethod
+    def _get_stream_schema() -> Dict[str, tuple]:
+        # stream type of the media provider => (Kodi stream type, (Kodi stream key, stream field, converter, default))
+        # TODO(stub): adjust the stream types, stream fields and converters to the ones provided by the media provider
+        return {
+            "Video": (
+                "video",
+                (
+                    ("codec", "TODO(stub)", None, ""),
+                    ("profile", "TODO(stub)", None, ""),
+                    ("language", "TODO(stub)", None, ""),
+                    ("width", "TODO(stub)", int, 0),
+                    ("height", "TODO(stub)", int, 0),
+                    ("aspect", "TODO(stub)", None, ""),
+                    ("stereomode", "TODO(stub)", None, ""),
+                ),
+            ),
+            "Audio": (
+                "audio",
+                (
+                    ("codec", "TODO(stub)", None, ""),
+                    ("profile", "TODO(stub)", None, ""),
+                    ("language", "TODO(stub)", None, ""),
+                    ("channels", "TODO(stub)", int, 2),
+                ),
+            ),
+            "Subtitle": (
+                "subtitle",
+                (("language", "TODO(stub)", None, ""),),
+            ),
+        }
 
-        # handle unique / provider IDs
-        unique_ids = {"TODO(stub)": "TODO(stub)"}
-        default_unique_id = Api._map_default_unique_id(unique_ids, media_type)
-        # add the item"s ID as a unique ID
-        unique_ids["TODO(stub)"] = "TODO(stub)"
-        item.getVideoInfoTag().setUniqueIDs(unique_ids, default_unique_id)
+    @staticmethod
+    def _default_factory(default):
+        # mutable default values (e.g. lists) are copied for every item because Kodi (or an interner) might modify them
+        if isinstance(default, (list, dict, set)):
+            return default.copy
 
-        # handle resume point
-        item.setProperties(
-            {
-                "totaltime": info["duration"],
-                "resumetime": 0,  # TODO(stub)
-            }
+        return lambda: default
+
+    @staticmethod
+    def _compile_fields(fields: tuple):
+        # split the fields once to not look up whether a field has a converter for every item
+        plain_fields = tuple(
+            (key, field, Api._default_factory(default)) for (key, field, converter, default) in fields if not converter
+        )
+        converted_fields = tuple(
+            (key, field, converter, Api._default_factory(default))
+            for (key, field, converter, default) in fields
+            if converter
         )
 
-        # stream details
-        for _ in ["TODO(stub)"]:
-            stream_type = "TODO(stub)"
-            if stream_type == "Video":
-                item.addStreamInfo(
-                    "video",
-                    {
-                        "codec": "TODO(stub)",
-                        "profile": "TODO(stub)",
-                        "language": "TODO(stub)",
-                        "width": 0,  # TODO(stub)
-                        "height": 0,  # TODO(stub)
-                        "aspect": "TODO(stub)",
-                        "stereomode": "TODO(stub)",
-                        "duration": info["duration"],
-                    },
-                )
-            elif stream_type == "Audio":
-                item.addStreamInfo(
-                    "audio",
-                    {
-                        "codec": "TODO(stub)",
-                        "profile": "TODO(stub)",
-                        "language": "TODO(stub)",
-                        "channels": 2,  # TODO(stub)
-                    },
-                )
-            elif stream_type == "Subtitle":
-                item.addStreamInfo(
-                    "subtitle",
+        def map_fields(obj: Dict) -> Dict:
+            get = obj.get
+            infos = {}
+            # a field explicitly set to null by the media provider gets the default value like a missing one
+            for (key, field, default) in plain_fields:
+                value = get(field)
+                infos[key] = default() if value is None else value
+            for (key, field, converter, default) in converted_fields:
+                value = get(field)
+                infos[key] = default() if value is None else converter(value)
+
+            return infos
+
+        return map_fields
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _compile_video_info_mapper(media_type: str):
+        # only keep the parts of the schema which are relevant for the given media type
+        map_infos = Api._compile_fields(
+            tuple(
+                (key, field, converter, default)
+                for (key, field, converter, default, media_types) in Api._get_video_info_schema()
+                if media_types is None or media_type in media_types
+            )
+        )
+
+        is_tvshow = media_type == xbmcmediaimport.MediaTypeTvShow
+        date_key = "aired" if media_type == xbmcmediaimport.MediaTypeEpisode else "premiered"
+
+        stream_mappers = None
+        if media_type in Api.PLAYABLE_MEDIA_TYPES:
+            stream_mappers = {
+                stream_type: (kodi_stream_type, Api._compile_fields(fields))
+                for (stream_type, (kodi_stream_type, fields)) in Api._get_stream_schema().items()
+            }
+
+        # pylint: disable=unused-argument
+        def map_video_infos(item_obj: Dict, item: ListItem, allow_direct_play: bool, interner: "Api.Interner"):
+            info = map_infos(item_obj)
+            if interner:
+                interner.intern_info(info)
+            info["mediatype"] = media_type
+            info["filenameandpath"] = item.getPath()
+            info["title"] = item.getLabel() or ""
+            if is_tvshow:
+                info["tvshowtitle"] = info["title"]
+
+            # handle aired / premiered
+            date = item.getDateTime()
+            if date:
+                pos = date.find("T")
+                if pos >= 0:
+                    date = date[:pos]
+
+                info[date_key] = date
+
+            # handle actors / cast
+            cast = []
+            for index, _ in enumerate("TODO(stub)"):  # TODO(stub)
+                cast.append(
                     {
-                        "language": "TODO(stub)",
-                    },
+                        "name": interner.intern("TODO(stub)") if interner else "TODO(stub)",
+                        "role": "TODO(stub)",
+                        "order": index,
+                        "thumbnail": "TODO(stub)",
+                    }
                 )
 
-    @staticmethod
-    def _map_path(path: str, container: str = None) -> str:
-        if not path:
-            return ""
+            # store the collected information in the ListItem
+            item.setInfo("video", info)
+            item.setCast(cast)
 
-        # turn UNC paths into Kodi-specific Samba paths
-        if path.startswith("\\\\"):
-            path = path.replace("\\\\", "smb://", 1).replace("\\\\", "\\").replace("\\", "/")
+            # handle unique / provider IDs
+            unique_ids = {"TODO(stub)": "TODO(stub)"}
+            default_unique_id = Api._map_default_unique_id(unique_ids, media_type)
+            # add the item"s ID as a unique ID
+            unique_ids["TODO(stub)"] = "TODO(stub)"
+            item.getVideoInfoTag().setUniqueIDs(unique_ids, default_unique_id)
 
-        # for DVDs and Blue-Ray try to directly access the main playback item
-        if container == "dvd":
-            path = f"{path}/VIDEO_TS/VIDEO_TS.IFO"
-        elif container == "bluray":
-            path = f"{path}/BDMV/index.bdmv"
+            if stream_mappers is None:
+                return
 
-        # get rid of any double backslashes
-        path = path.replace("\\\\", "\\")
+            # handle resume point
+            item.setProperties(
+                {
+                    "totaltime": info["duration"],
+                    "resumetime": 0,  # TODO(stub)
+                }
+            )
+
+            # stream details
+            for stream_obj in item_obj.get("TODO(stub)", ()):
+                stream_mapper = stream_mappers.get(stream_obj.get("TODO(stub)"))
+                if not stream_mapper:
+                    continue
+
+                (kodi_stream_type, map_stream) = stream_mapper
+                stream = map_stream(stream_obj)
+                if kodi_stream_type == "video":
+                    stream["duration"] = info["duration"]
+                item.addStreamInfo(kodi_stream_type, stream)
 
-        # make sure paths are consistent
-        if "\\" in path:
-            path.replace("/", "\\")
+        return map_video_infos
 
-        # Kodi expects protocols in lower case
-        path_parts = urlparse(path)
-        if path_parts.scheme:
-            path = urlunparse(path_parts._replace(scheme=path_parts.scheme.lower()))
+    @staticmethod
+    def fill_video_infos(
+        item_obj: Dict,
+        media_type: str,
+        item: ListItem,
+        allow_direct_play: bool = True,
+        interner: "Api.Interner" = None,
+    ):
+        # the schema is compiled into a mapper once per media type
+        Api._compile_video_info_mapper(media_type)(item_obj, item, allow_direct_play, interner)
 
-        return path
+    @staticmethod
+    def _execute_jsonrpc(method: str, params: Dict) -> Dict:
+        json_response = json.loads(
+            xbmc.executeJSONRPC(
+                json.dumps(
+                    {
+                        "jsonrpc": "2.0",
+                        "method": method,
+                        "params": params,
+                        "id": 0,
+                    }
+                )
+            )
+        )
+        if not json_response or "result" not in json_response:
+            return None
+
+        return json_response["result"]
+
+    @staticmethod
+    def _retrieve_unique_ids(media_type: str) -> Dict[int, Dict[str, str]]:
+        if media_type not in Api.JSONRPC_METHODS:
+            return {}
+
+        json_result = Api._execute_jsonrpc(
+            f"VideoLibrary.Get{Api.JSONRPC_METHODS[media_type]}s",
+            {
+                "properties": ["uniqueid"],
+            },
+        )
+        items_key = f"{media_type}s"
+        if not json_result or items_key not in json_result:
+            return {}
+
+        id_key = f"{media_type}id"
+        return {
+            json_item[id_key]: json_item["uniqueid"]
+            for json_item in json_result[items_key]
+            if id_key in json_item and "uniqueid" in json_item
+        }
+
+    @staticmethod
+    def _map_path(path: str, container: str = None, path_mapper: PathMapper = None) -> str:
+        # the path mapper contains the path substitutions of the media provider
+        return (path_mapper or Api.DEFAULT_PATH_MAPPER).map(path, container=container)
 
     @staticmethod
     def _map_overview(overview: str) -> str:
@@ -6,19 +6,65 @@
 #  See LICENSES/README.md for more information.
 #
 
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import time
+from typing import Dict, List
+
+import xbmc  # pylint: disable=import-error
 import xbmcmediaimport  # pylint: disable=import-error
 
+from lib.action_server import ActionServer
+from lib.fingerprints import FingerprintStore, fingerprint_store
 from lib.monitor import Monitor
 from lib.provider_observer import ProviderObserver
+from lib.update_log import update_log
+from lib.update_queue import update_queue
 from lib.utils import import2str, log
 
 
 class ObserverService(xbmcmediaimport.Observer):
+    # maximum time in seconds between two checks for an abort request (which also lets Kodi deliver its callbacks)
+    ABORT_CHECK_INTERVAL = 1.0
+    # time in seconds to wait for an abort request when checking for it
+    ABORT_CHECK_WAIT = 0.001
+    # maximum number of media providers whose changes are retrieved concurrently
+    MAX_WORKERS = 4
+    # maximum time in seconds a media provider may take to retrieve its changes before they are discarded
+    RETRIEVAL_TIMEOUT = 60.0
+    # delay in seconds before pending playback updates are replayed again
+    REPLAY_DELAY = 5.0
+    # maximum delay in seconds between two attempts to replay pending playback updates
+    MAX_REPLAY_DELAY = 300.0
+
+    class Replay:  # pylint: disable=too-few-public-methods
+        def __init__(self, push_connections: int):
+            # ongoing replay of pending playback updates
+            self.future = None
+            # monotonic time from which on pending playback updates are replayed
+            self.due = time.monotonic()
+            self.delay = ObserverService.REPLAY_DELAY
+            # number of times the media provider's push channel had been established when replaying
+            self.push_connections = push_connections
+
     def __init__(self):
         super(xbmcmediaimport.Observer, self).__init__()
 
         self._monitor = Monitor()
+        # set by observers (from background threads) as soon as they have to be processed
+        self._wake = threading.Event()
         self._observers = {}
+        # changes are retrieved from the media providers on worker threads so a slow one doesn't block the others
+        # all interaction with Kodi (incl. passing on the retrieved changes) stays on the service thread
+        self._executor = ThreadPoolExecutor(max_workers=ObserverService.MAX_WORKERS, thread_name_prefix="Observer")
+        # media provider identifier => (future, deadline) of the ongoing retrieval of changes
+        # the deadline is None if the retrieved changes will be discarded
+        self._retrievals = {}
+        # media provider identifier => replay of pending playback updates to the connected media provider
+        self._replays = {}
+
+        # execute the importer actions in this long-running service to keep their state warm
+        self._action_server = ActionServer()
 
         # TODO(stub): add additional members
 
@@ -27,19 +73,157 @@ class ObserverService(xbmcmediaimport.Observer):
     def _run(self):
         log("Observing stub media providers...")
 
-        while not self._monitor.abortRequested():
-            # process all observers
-            for observer in self._observers.values():
-                observer.Process()
+        # coalesce playback updates from importer actions executed by the action server
+        update_queue.start()
+        self._action_server.start()
+
+        try:
+            while not self._monitor.abortRequested():
+                # changes which are pushed while processing the observers wake the service up immediately afterwards
+                self._wake.clear()
+
+                # process all observers
+                for media_provider_id, observer in self._observers.items():
+                    self._process_observer(media_provider_id, observer)
+
+                # TODO(stub): perform additional processing (e.g. player interaction / callbacks)
+
+                # sleep until an observer has to be processed again
+                self._wake.wait(self._next_timeout())
+                if self._monitor.waitForAbort(ObserverService.ABORT_CHECK_WAIT):
+                    break
+        finally:
+            self._stop()
 
-            # TODO(stub): perform additional processing (e.g. player interaction / callbacks)
+    def _process_observer(self, media_provider_id: str, observer: ProviderObserver):
+        # a failing media provider mustn't keep the other media providers from being observed
+        try:
+            observer.process(self._collect_changes(media_provider_id))
+            self._retrieve_changes(media_provider_id, observer)
 
-            if self._monitor.waitForAbort(1):
-                break
+            self._replay_updates(media_provider_id, observer)
+        except Exception as e:  # pylint: disable=broad-except
+            log(f"failed to process observer of media provider {media_provider_id}: {e}", xbmc.LOGERROR)
 
+    def _stop(self):
         # stop all observers
-        for observer in self._observers.values():
-            observer.Stop()
+        for media_provider_id, observer in self._observers.items():
+            self._discard_retrieval(media_provider_id)
+            try:
+                observer.stop()
+                observer.process()
+            except Exception as e:  # pylint: disable=broad-except
+                log(f"failed to stop observer of media provider {media_provider_id}: {e}", xbmc.LOGERROR)
+
+        # don't wait for media providers which are still busy (their retrievals have been cancelled)
+        self._executor.shutdown(wait=False)
+
+        self._action_server.stop()
+        update_queue.stop()
+
+    def _next_timeout(self) -> float:
+        timeout = ObserverService.ABORT_CHECK_INTERVAL
+        for media_provider_id, observer in self._observers.items():
+            # an outstanding (or even hung) retrieval wakes the service up once it is done
+            observer_timeout = observer.next_process(retrieving=media_provider_id in self._retrievals)
+            if observer_timeout is not None:
+                timeout = min(timeout, observer_timeout)
+
+        return timeout
+
+    def _retrieve_changes(self, media_provider_id: str, observer: ProviderObserver):
+        # only retrieve changes once at a time per media provider
+        if media_provider_id in self._retrievals:
+            return
+
+        retrieve = observer.prepare_retrieval()
+        if not retrieve:
+            return
+
+        future = self._executor.submit(retrieve)
+        self._retrievals[media_provider_id] = (future, time.monotonic() + ObserverService.RETRIEVAL_TIMEOUT)
+        future.add_done_callback(lambda _: self._wake.set())
+
+    def _collect_changes(self, media_provider_id: str) -> List[Dict]:
+        if media_provider_id not in self._retrievals:
+            return None
+
+        (future, deadline) = self._retrievals[media_provider_id]
+        if not future.done():
+            if deadline is not None and time.monotonic() >= deadline:
+                # keep the retrieval until it is done to not retrieve changes from the media provider concurrently
+                self._retrievals[media_provider_id] = (future, None)
+                log(
+                    (
+                        f"retrieving changes from media provider {media_provider_id} took longer than "
+                        f"{ObserverService.RETRIEVAL_TIMEOUT}s, discarding them"
+                    ),
+                    xbmc.LOGWARNING,
+                )
+            return None
+
+        del self._retrievals[media_provider_id]
+        if deadline is None:
+            return None
+
+        try:
+            return future.result()
+        except Exception as e:  # pylint: disable=broad-except
+            log(f"failed to retrieve changes from media provider {media_provider_id}: {e}", xbmc.LOGWARNING)
+            return None
+
+    def _discard_retrieval(self, media_provider_id: str):
+        if media_provider_id not in self._retrievals:
+            return
+
+        (future, _) = self._retrievals[media_provider_id]
+        if future.cancel():
+            del self._retrievals[media_provider_id]
+        else:
+            self._retrievals[media_provider_id] = (future, None)
+
+    def _replay_updates(self, media_provider_id: str, observer: ProviderObserver):
+        if not observer.connected:
+            self._replays.pop(media_provider_id, None)
+            return
+
+        # replay playback updates which couldn't be sent while the media provider was unreachable
+        replay = self._replays.get(media_provider_id)
+        if not replay:
+            replay = ObserverService.Replay(observer.push_connections)
+            self._replays[media_provider_id] = replay
+        elif replay.future:
+            if not replay.future.done():
+                return
+
+            if self._replayed(media_provider_id, replay.future):
+                replay.delay = ObserverService.REPLAY_DELAY
+                replay.due = time.monotonic() + replay.delay
+            else:
+                # back off while the media provider doesn't accept the playback updates
+                replay.due = time.monotonic() + replay.delay
+                replay.delay = min(replay.delay * 2, ObserverService.MAX_REPLAY_DELAY)
+            replay.future = None
+
+        # the media provider is reachable again once its push channel has been re-established
+        if replay.push_connections != observer.push_connections:
+            replay.push_connections = observer.push_connections
+            replay.delay = ObserverService.REPLAY_DELAY
+            replay.due = time.monotonic()
+
+        if time.monotonic() < replay.due or not update_log.has_pending(observer.client.url):
+            return
+
+        # sending the updates to the media provider mustn't block the service thread
+        replay.future = self._executor.submit(update_queue.replay, observer.client)
+
+    @staticmethod
+    def _replayed(media_provider_id: str, future: Future) -> bool:
+        try:
+            return future.result()
+        except Exception as e:  # pylint: disable=broad-except
+            log(f"failed to replay playback updates to media provider {media_provider_id}: {e}", xbmc.LOGWARNING)
+            return False
 
     def _add_observer(self, media_provider: xbmcmediaimport.MediaProvider):
         if not media_provider:
@@ -53,7 +237,7 @@ class ObserverService(xbmcmediaimport.Observer):
             return
 
         # create the observer
-        self._observers[media_provider_id] = ProviderObserver()
+        self._observers[media_provider_id] = ProviderObserver(wake=self._wake.set)
 
     def _remove_observer(self, media_provider: xbmcmediaimport.MediaProvider):
         if not media_provider:
@@ -65,6 +249,12 @@ class ObserverService(xbmcmediaimport.Observer):
         if media_provider_id not in self._observers:
             return
 
+        # the changes retrieved from a removed media provider aren't needed anymore
+        retrieval = self._retrievals.pop(media_provider_id, None)
+        if retrieval:
+            retrieval[0].cancel()
+        self._replays.pop(media_provider_id, None)
+        self._observers[media_provider_id].stop()
         del self._observers[media_provider_id]
 
     def _start_observer(self, media_provider: xbmcmediaimport.MediaProvider):
@@ -85,6 +275,7 @@ class ObserverService(xbmcmediaimport.Observer):
         if media_provider_id not in self._observers:
             return
 
+        self._discard_retrieval(media_provider_id)
         self._observers[media_provider_id].stop()
 
     def _add_import(self, media_import: xbmcmediaimport.MediaImport):
@@ -109,6 +300,9 @@ class ObserverService(xbmcmediaimport.Observer):
         if not media_provider:
             raise ValueError(f"cannot remove media import {import2str(media_import)} with invalid media provider")
 
+        # the fingerprints of the imported items must not be used by a media import added later on
+        fingerprint_store.clear(FingerprintStore.get_import_key(media_import))
+
         media_provider_id = media_provider.getIdentifier()
         if media_provider_id not in self._observers:
             return
@@ -0,0 +1,104 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+PATH_SEPARATORS = ("/", "\\")
+
+
+class PathMapper:
+    # maximum number of mapped directories to remember
+    DEFAULT_CACHE_SIZE = 4096
+
+    # key of the substitution (source, target) ending at a node of the trie
+    _SUBSTITUTION = ""
+
+    def __init__(self, substitutions: Iterable[Tuple[str, str]] = (), cache_size: int = DEFAULT_CACHE_SIZE):
+        if cache_size <= 0:
+            raise ValueError("invalid cache_size")
+
+        # trie of the source paths of all substitutions (one node per character)
+        self._trie = {}
+        for source, target in substitutions:
+            if not source:
+                raise ValueError("invalid substitution without source path")
+
+            node = self._trie
+            for char in source:
+                node = node.setdefault(char, {})
+            # the first substitution of a source path wins
+            node.setdefault(PathMapper._SUBSTITUTION, (source, target))
+
+        # most items of a media provider share the same directories
+        self._map_directory = lru_cache(maxsize=cache_size)(self._map_directory_uncached)
+
+    def map(self, path: str, container: str = None) -> str:
+        if not path:
+            return ""
+
+        # substitutions are applied to the directory part of the path
+        pos = max(path.rfind("/"), path.rfind("\\")) + 1
+        path = self._map_directory(path[:pos]) + path[pos:]
+
+        # for DVDs and Blue-Ray try to directly access the main playback item
+        if container in ("dvd", "bluray"):
+            separator = "\\" if "\\" in path and "://" not in path else "/"
+            if container == "dvd":
+                path = f"{path}{separator}VIDEO_TS{separator}VIDEO_TS.IFO"
+            else:
+                path = f"{path}{separator}BDMV{separator}index.bdmv"
+
+        return path
+
+    def cache_info(self):
+        return self._map_directory.cache_info()
+
+    def _map_directory_uncached(self, directory: str) -> str:
+        return PathMapper.normalize(self._substitute(directory))
+
+    def _substitute(self, path: str) -> str:
+        # find the longest source path which is a prefix of the path and ends at a path separator
+        substitution = None
+        node = self._trie
+        for index, char in enumerate(path):
+            node = node.get(char)
+            if node is None:
+                break
+
+            match = node.get(PathMapper._SUBSTITUTION)
+            if match and (
+                match[0][-1] in PATH_SEPARATORS or index + 1 == len(path) or path[index + 1] in PATH_SEPARATORS
+            ):
+                substitution = match
+
+        if not substitution:
+            return path
+
+        (source, target) = substitution
+        return f"{target}{path[len(source):]}"
+
+    @staticmethod
+    def normalize(path: str) -> str:
+        # turn UNC paths into Kodi-specific Samba paths
+        if path.startswith("\\\\"):
+            path = path.replace("\\\\", "smb://", 1).replace("\\\\", "\\").replace("\\", "/")
+
+        # get rid of any double backslashes
+        path = path.replace("\\\\", "\\")
+
+        # make sure paths are consistent: URLs only use slashes, other paths containing backslashes only backslashes
+        scheme, separator, remainder = path.partition("://")
+        if separator:
+            # Kodi expects protocols in lower case
+            remainder = remainder.replace("\\", "/")
+            path = f"{scheme.lower()}://{remainder}"
+        elif "\\" in path:
+            path = path.replace("/", "\\")
+
+        return path
@@ -0,0 +1,220 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List
+
+
+class ImportPipeline:
+    # maximum number of media types processed concurrently
+    MAX_WORKERS = 4
+    # maximum number of batches buffered per media type
+    QUEUE_SIZE = 4
+    # interval in seconds in which blocked workers check for cancellation
+    CANCEL_CHECK_INTERVAL = 0.1
+    # interval in seconds after which waiting for results is interrupted to allow checking for cancellation
+    RESULTS_POLL_INTERVAL = 0.5
+
+    class Task:
+        def __init__(self, cancelled: threading.Event):
+            self._cancelled = cancelled
+            self._total = 0
+
+        def cancelled(self) -> bool:
+            return self._cancelled.is_set()
+
+        @property
+        def total(self) -> int:
+            return self._total
+
+        def set_total(self, total: int):
+            if total < 0:
+                raise ValueError("invalid total")
+
+            self._total = total
+
+    class _Done:  # pylint: disable=too-few-public-methods
+        pass
+
+    class _Failure:  # pylint: disable=too-few-public-methods
+        def __init__(self, exception: Exception):
+            self.exception = exception
+
+    def __init__(self, max_workers: int = MAX_WORKERS, queue_size: int = QUEUE_SIZE):
+        if max_workers <= 0:
+            raise ValueError("invalid max_workers")
+        if queue_size <= 0:
+            raise ValueError("invalid queue_size")
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ImportPipeline")
+        self._queue_size = queue_size
+        self._queues = {}
+        self._tasks = {}
+        self._cancelled = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, key: str, producer: Callable[["ImportPipeline.Task"], Iterable[List]]):
+        if key in self._queues:
+            raise ValueError(f"producer for {key} already submitted")
+
+        # the producer runs on a worker thread and hands over its batches through a bounded queue
+        batches = queue.Queue(maxsize=self._queue_size)
+        task = ImportPipeline.Task(self._cancelled)
+        self._queues[key] = batches
+        self._tasks[key] = task
+        self._executor.submit(self._produce, producer, task, batches)
+
+    def results(self, key: str) -> Iterator[List]:
+        # yields an empty batch whenever no batch has been produced in time
+        if key not in self._queues:
+            raise ValueError(f"no producer for {key} submitted")
+
+        batches = self._queues[key]
+        while not self.cancelled():
+            try:
+                result = batches.get(timeout=ImportPipeline.RESULTS_POLL_INTERVAL)
+            except queue.Empty:
+                yield []
+                continue
+
+            if isinstance(result, ImportPipeline._Done):
+                return
+            if isinstance(result, ImportPipeline._Failure):
+                raise result.exception
+
+            yield result
+
+    def total(self) -> int:
+        # the total number of items of all producers as far as it is known
+        return sum(task.total for task in self._tasks.values())
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def close(self):
+        # make sure that no worker is left waiting on a full queue
+        self.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _produce(
+        self,
+        producer: Callable[["ImportPipeline.Task"], Iterable[List]],
+        task: "ImportPipeline.Task",
+        batches: queue.Queue,
+    ):
+        try:
+            for result in producer(task):
+                if not self._put(batches, result):
+                    return
+        except Exception as e:  # pylint: disable=broad-except
+            self._put(batches, ImportPipeline._Failure(e))
+            return
+
+        self._put(batches, ImportPipeline._Done())
+
+    def _put(self, batches: queue.Queue, result) -> bool:
+        while not self._cancelled.is_set():
+            try:
+                batches.put(result, timeout=ImportPipeline.CANCEL_CHECK_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+
+class PagePrefetcher:  # pylint: disable=too-few-public-methods
+    # number of pages retrieved ahead of the page being processed
+    PREFETCH = 2
+    # interval in seconds in which waiting for a page checks for cancellation
+    CANCEL_CHECK_INTERVAL = 0.1
+
+    def __init__(
+        self, fetch_page: Callable[[int], List], prefetch: int = PREFETCH, cancelled: Callable[[], bool] = None
+    ):
+        # fetch_page(index) retrieves the page with the given index and returns an empty page after the last page
+        if not fetch_page:
+            raise ValueError("invalid fetch_page")
+        if prefetch < 0:
+            raise ValueError("invalid prefetch")
+
+        self._fetch_page = fetch_page
+        self._prefetch = prefetch
+        self._cancelled = cancelled or (lambda: False)
+
+    def __iter__(self) -> Iterator[List]:
+        # the page being processed and the prefetched pages are fetched concurrently
+        executor = ThreadPoolExecutor(max_workers=self._prefetch + 1, thread_name_prefix="PagePrefetcher")
+        pending = deque()
+        next_index = 0
+        try:
+            while True:
+                # at most the page being processed and the prefetched pages are buffered
+                while len(pending) <= self._prefetch and not self._cancelled():
+                    pending.append(executor.submit(self._fetch_page, next_index))
+                    next_index += 1
+
+                page = self._wait(pending.popleft()) if pending else None
+                if not page:
+                    return
+
+                yield page
+        finally:
+            # pages which haven't been retrieved yet aren't needed anymore
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _wait(self, future) -> List:
+        while not self._cancelled():
+            try:
+                return future.result(timeout=PagePrefetcher.CANCEL_CHECK_INTERVAL)
+            except FutureTimeoutError:
+                continue
+
+        future.cancel()
+        return None
+
+
+class CancellationCheck:
+    # minimum interval in seconds between two checks
+    MIN_INTERVAL = 0.1
+
+    def __init__(self, should_cancel: Callable[[int, int], bool], min_interval: float = MIN_INTERVAL):
+        self._should_cancel = should_cancel
+        self._min_interval = min_interval
+        self._last_check = None
+        self.checks = 0
+        self.duration = 0.0
+
+    def __call__(self, progress: int, total: int, force: bool = False) -> bool:
+        # limit how often the (potentially expensive) check is performed
+        now = time.monotonic()
+        if not force and self._last_check is not None and now - self._last_check < self._min_interval:
+            return False
+        self._last_check = now
+
+        start = time.perf_counter()
+        cancel = self._should_cancel(progress, total)
+        self.duration += time.perf_counter() - start
+        self.checks += 1
+
+        return cancel
@@ -6,61 +6,96 @@
 #  See LICENSES/README.md for more information.
 #
 
-from typing import List, Tuple
+from functools import partial
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Iterable, List, Tuple
 
 import xbmc  # pylint: disable=import-error
 import xbmcgui  # pylint: disable=import-error
 import xbmcmediaimport  # pylint: disable=import-error
 
+from lib.change_batcher import ChangeBatcher
+from lib.client import ProviderClient
+from lib.push_channel import PushChannel
 from lib.utils import import2str, log, provider2str
 
 
 class ProviderObserver:
+    # TODO(stub): path of the media provider's event stream (server-sent events), empty to poll the media provider
+    PUSH_PATH = ""
+    # interval in seconds in which the media provider is polled for changes if they cannot be pushed
+    POLL_INTERVAL = 30.0
+    # time in seconds without any further pushed changes after which the collected changes are passed on
+    CHANGE_WINDOW = 0.05
+
     class Action:
         START = 0
         STOP = 1
 
-    def __init__(self):
+    def __init__(self, wake: Callable[[], None] = None):
+        # wake() is called from a background thread whenever the observer has to be processed
+        self._wake = wake
         # default values
         self._actions = []
+        # set when the retrieval of changes from the media provider has to be cancelled
+        self._cancelled = threading.Event()
+        # collects and folds changed items before passing them to Kodi
+        self._change_batcher = ChangeBatcher(window=ProviderObserver.CHANGE_WINDOW)
+        self._client = None
         self._connected = False
-        self._imports = []
+        # (media provider identifier, media types) => media import
+        self._imports = {}
+        # media type => first media import containing the media type
+        self._imports_by_media_type = {}
         self._media_provider = None
+        self._next_poll = None
+        self._push_channel = None
         self._settings = None
 
     def __del__(self):
         self._stop_action()
 
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    @property
+    def client(self) -> ProviderClient:
+        return self._client
+
+    @property
+    def push_connections(self) -> int:
+        # number of times the media provider's push channel has been (re-)established
+        return self._push_channel.connections if self._push_channel else 0
+
     def add_import(self, media_import: xbmcmediaimport.MediaImport):
         if not media_import:
             raise ValueError("invalid media_import")
 
-        # look for a matching import
-        matching_import_indices = self._find_import_indices(media_import)
-        # if a matching import has been found update it
-        if matching_import_indices:
-            self._imports[matching_import_indices[0]] = media_import
-            ProviderObserver.log(
-                f"media import {import2str(media_import)} from {provider2str(self._media_provider)} updated"
-            )
-        else:
-            # otherwise add the import to the list
-            self._imports.append(media_import)
-            ProviderObserver.log(
-                f"media import {import2str(media_import)} from {provider2str(self._media_provider)} added"
-            )
+        # look for a matching import and either update it or add the import
+        import_key = ProviderObserver._get_import_key(media_import)
+        updated = import_key in self._imports
+        self._imports[import_key] = media_import
+        self._index_imports_by_media_type()
+
+        ProviderObserver.log(
+            f"media import {import2str(media_import)} from {provider2str(self._media_provider)} "
+            f"{'updated' if updated else 'added'}"
+        )
 
     def remove_import(self, media_import: xbmcmediaimport.MediaImport):
         if not media_import:
             raise ValueError("invalid media_import")
 
         # look for a matching import
-        matching_import_indices = self._find_import_indices(media_import)
-        if not matching_import_indices:
+        import_key = ProviderObserver._get_import_key(media_import)
+        if import_key not in self._imports:
             return
 
-        # remove the media import from the list
-        del self._imports[matching_import_indices[0]]
+        # remove the media import
+        del self._imports[import_key]
+        self._index_imports_by_media_type()
         ProviderObserver.log(
             f"media import {import2str(media_import)} from {provider2str(self._media_provider)} removed"
         )
@@ -72,25 +107,66 @@ class ProviderObserver:
         self._actions.append((ProviderObserver.Action.START, media_provider))
 
     def stop(self):
+        # cancel any ongoing retrieval of changes right away
+        self._cancelled.set()
         self._actions.append((ProviderObserver.Action.STOP, None))
 
-    def process(self):
+    def process(self, changes: List[Dict] = None):
+        # must be called from the thread interacting with Kodi
+        # changes are the ones returned by a function from prepare_retrieval()
+
         # process any open actions
         self._process_actions()
 
+        if changes and self._connected:
+            self._change_items(self._convert_events(changes))
+
         # TODO(stub): perform additional processing
-        # TODO(stub): call self._change_items(items) to pass changed items to Kodi
 
-    def _find_import_indices(self, media_import: xbmcmediaimport.MediaImport) -> List[int]:
+        # pass on changed items which have been collected long enough
+        self._flush_changes()
+
+    def prepare_retrieval(self) -> Callable[[], List[Dict]]:
+        # returns a function retrieving the changes from the media provider or None if there's nothing to retrieve
+        # the function doesn't interact with Kodi so it can be run on any thread
+        if not self._connected:
+            return None
+
+        # fall back to polling the media provider if it cannot push its changes
+        poll = self._polling() and time.monotonic() >= self._next_poll
+        if poll:
+            self._next_poll = time.monotonic() + ProviderObserver.POLL_INTERVAL
+        elif not self._push_channel or not self._push_channel.pending:
+            return None
+
+        return partial(ProviderObserver._retrieve_changes, self._client, self._push_channel, poll, self._cancelled)
+
+    def next_process(self, retrieving: bool = False) -> float:
+        # time in seconds until the observer has to be processed again or None if it only waits for pushed changes
+        # while changes are being retrieved (retrieving) the observer is processed again once they have been retrieved
+        if self._actions:
+            return 0.0
+
+        timeouts = [self._change_batcher.next_due()]
+        if self._polling() and not retrieving:
+            timeouts.append(max(0.0, self._next_poll - time.monotonic()))
+
+        return min((timeout for timeout in timeouts if timeout is not None), default=None)
+
+    @staticmethod
+    def _get_import_key(media_import: xbmcmediaimport.MediaImport) -> Tuple[str, FrozenSet[str]]:
         if not media_import:
             raise ValueError("invalid media_import")
 
-        return [
-            i
-            for i, localImport in enumerate(self._imports)
-            if localImport.getProvider().getIdentifier() == media_import.getProvider().getIdentifier()
-            and localImport.getMediaTypes() == media_import.getMediaTypes()
-        ]
+        # only retrieve the identifiers from Kodi once when the media import is added / removed
+        return (media_import.getProvider().getIdentifier(), frozenset(media_import.getMediaTypes()))
+
+    def _index_imports_by_media_type(self):
+        # the first added media import containing a media type handles changed items of that media type
+        self._imports_by_media_type = {}
+        for (_, media_types), media_import in self._imports.items():
+            for media_type in media_types:
+                self._imports_by_media_type.setdefault(media_type, media_import)
 
     def _process_actions(self):
         for (action, data) in self._actions:
@@ -103,7 +179,51 @@ class ProviderObserver:
 
         self._actions = []
 
-    def _change_items(self, items: Tuple[int, xbmcgui.ListItem, str]):
+    def _polling(self) -> bool:
+        return self._connected and (not self._push_channel or self._push_channel.fallback)
+
+    @staticmethod
+    def _retrieve_changes(
+        client: ProviderClient, push_channel: PushChannel, poll: bool, cancelled: threading.Event
+    ) -> List[Dict]:
+        # the changes pushed by the media provider have already been received
+        changes = push_channel.events() if push_channel else []
+        if poll and not cancelled.is_set():
+            changes.extend(ProviderObserver._poll(client, cancelled))
+
+        return changes
+
+    @staticmethod
+    def _poll(client: ProviderClient, cancelled: threading.Event) -> List[Dict]:  # pylint: disable=unused-argument
+        # TODO(stub): retrieve the changes from the media provider using client without interacting with Kodi
+        # TODO(stub): stop early if cancelled is set
+        # TODO(stub): return the changes in the same format as the events pushed by the media provider
+        return []
+
+    def _convert_events(self, events: Iterable[Dict]) -> List[Tuple[int, xbmcgui.ListItem, str]]:
+        changes = []
+        for event in events:
+            change = self._convert_event(event)
+            if change:
+                changes.append(change)
+
+        return changes
+
+    def _convert_event(self, event: Dict) -> Tuple[int, xbmcgui.ListItem, str]:  # pylint: disable=unused-argument
+        # TODO(stub): convert the event pushed by the media provider into (changeset type, item, item ID)
+        # TODO(stub): return None for events which don't change any item
+        return None
+
+    def _change_items(self, items: Iterable[Tuple[int, xbmcgui.ListItem, str]]):
+        # collect the changed items to fold repeated changes of the same item and pass them on in batches
+        self._change_batcher.add(items)
+        self._flush_changes()
+
+    def _flush_changes(self, force: bool = False):
+        while self._change_batcher.due() or (force and self._change_batcher):
+            self._pass_changed_items(self._change_batcher.take())
+
+    def _pass_changed_items(self, items: Iterable[Tuple[int, xbmcgui.ListItem, str]]):
         # map the changed items to their media import
         changed_items_map = {}
         for (changeset_type, item, item_id) in items:
@@ -150,15 +270,7 @@ class ProviderObserver:
         if not video_info_tag:
             return None
 
-        item_media_type = video_info_tag.getMediaType()
-
-        matching_imports = [
-            media_import for media_import in self._imports if item_media_type in media_import.getMediaTypes()
-        ]
-        if not matching_imports:
-            return None
-
-        return matching_imports[0]
+        return self._imports_by_media_type.get(video_info_tag.getMediaType())
 
     def _start_action(self, media_provider: xbmcmediaimport.MediaProvider):
         if not media_provider:
@@ -177,30 +289,48 @@ class ProviderObserver:
         if not self._settings:
             raise RuntimeError("cannot prepare media provider settings")
 
-        # TODO(stub): start observing the media provider
+        # retrievals of a previous run stay cancelled
+        self._cancelled = threading.Event()
+
+        # re-use the pooled connections to the media provider
+        self._client = ProviderClient.for_provider(self._settings)
+
+        # let the media provider push its changes (the media provider is polled if that is not possible)
+        self._next_poll = time.monotonic()
+        if ProviderObserver.PUSH_PATH:
+            self._push_channel = PushChannel(self._client, ProviderObserver.PUSH_PATH, on_event=self._wake)
+            self._push_channel.start()
 
         ProviderObserver.log(
             f"successfully connected to {provider2str(self._media_provider)} to observe media imports"
         )
-        self.connected = True
+        self._connected = True
         return True
 
     def _stop_action(self, restart: bool = False):
         if not self._connected:
             return
 
+        # pass on all collected changed items
+        self._flush_changes(force=True)
+
         if not restart:
             ProviderObserver.log(f"stopped observing media imports from {provider2str(self._media_provider)}")
 
-        # TODO(stub): stop observing the media provider
+        self._cancelled.set()
+        if self._push_channel:
+            self._push_channel.stop()
 
         self._reset()
 
     def _reset(self):
         # TODO(stub): reset internal members
 
+        self._client = None
         self._connected = False
         self._media_provider = None
+        self._next_poll = None
+        self._push_channel = None
 
     @staticmethod
     def log(message: str, level: int = xbmc.LOGINFO):
@@ -0,0 +1,207 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+import http.client
+import json
+import queue
+import socket
+import threading
+from typing import Callable, Dict, List
+
+from lib.client import ProviderClient
+
+
+class PushChannel:
+    # delay in seconds before the first attempt to reconnect
+    RECONNECT_DELAY = 0.5
+    # maximum delay in seconds between two attempts to reconnect
+    MAX_RECONNECT_DELAY = 60.0
+    # number of consecutive failed attempts to connect after which the media provider should be polled instead
+    FALLBACK_AFTER_FAILURES = 3
+    # time in seconds without any data (incl. heartbeats) after which the connection is considered dead
+    READ_TIMEOUT = 90
+
+    def __init__(
+        self,
+        client: ProviderClient,
+        path: str,
+        on_event: Callable[[], None] = None,
+        headers: Dict[str, str] = None,
+        read_timeout: float = READ_TIMEOUT,
+    ):
+        # receives server-sent events (text/event-stream) from the media provider on a background thread
+        # on_event() is called from the background thread whenever new events are available
+        if not client:
+            raise ValueError("invalid client")
+        if not path:
+            raise ValueError("invalid path")
+
+        self._client = client
+        self._path = path
+        self._on_event = on_event or (lambda: None)
+        self._headers = dict(headers or {})
+        self._headers.setdefault("Accept", "text/event-stream")
+        self._headers.setdefault("Cache-Control", "no-cache")
+        self._read_timeout = read_timeout
+
+        self._events = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._socket = None
+        self._socket_lock = threading.Lock()
+        self._connected = False
+        self._connections = 0
+        self._failures = 0
+        self._last_event_id = None
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    @property
+    def connections(self) -> int:
+        # number of times the channel has been (re-)established
+        return self._connections
+
+    @property
+    def fallback(self) -> bool:
+        # whether the media provider has to be polled because the channel cannot be established
+        return not self._connected and self._failures >= PushChannel.FALLBACK_AFTER_FAILURES
+
+    @property
+    def pending(self) -> bool:
+        # whether events have been received which haven't been retrieved yet
+        return not self._events.empty()
+
+    def start(self):
+        if self._thread:
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="PushChannel", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        if not self._thread:
+            return
+
+        self._stopped.set()
+        # interrupt the blocking read of the background thread
+        self._disconnect()
+
+        self._thread.join(timeout)
+        self._thread = None
+        self._connected = False
+
+    def events(self) -> List[Dict]:
+        # returns all events received since the last call
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self):
+        delay = PushChannel.RECONNECT_DELAY
+        while not self._stopped.is_set():
+            established = False
+            try:
+                established = self._receive()
+            except (OSError, http.client.HTTPException):
+                pass
+            finally:
+                self._connected = False
+                self._disconnect()
+
+            if established:
+                # the connection had been established so start over with the shortest delay
+                delay = PushChannel.RECONNECT_DELAY
+            else:
+                self._failures += 1
+
+            if self._stopped.wait(delay):
+                return
+            if not established:
+                delay = min(delay * 2, PushChannel.MAX_RECONNECT_DELAY)
+
+    def _receive(self) -> bool:
+        # returns whether the connection had been established before it was closed
+        headers = dict(self._headers)
+        if self._last_event_id:
+            # let the media provider resend the events which have been missed while being disconnected
+            headers["Last-Event-ID"] = self._last_event_id
+
+        (sock, response) = self._client.connect(self._path, headers=headers, timeout=self._read_timeout)
+        with self._socket_lock:
+            self._socket = sock
+        if self._stopped.is_set():
+            return False
+
+        if response.status != 200:
+            return False
+
+        self._connected = True
+        self._connections += 1
+        self._failures = 0
+
+        data = []
+        # the ID of an event only becomes the last event ID once the event has been dispatched
+        # otherwise the media provider wouldn't resend an event which has been interrupted by a disconnect
+        event_id = self._last_event_id
+        while not self._stopped.is_set():
+            line = response.readline()
+            if not line:
+                # the media provider closed the connection
+                return True
+
+            line = line.decode("utf-8").rstrip("\r\n")
+            if not line:
+                # an empty line dispatches the event
+                if data:
+                    self._dispatch("\n".join(data))
+                    data = []
+                self._last_event_id = event_id
+                continue
+
+            # lines starting with a colon are comments (e.g. heartbeats)
+            if line.startswith(":"):
+                continue
+
+            (field, _, value) = line.partition(":")
+            if value.startswith(" "):
+                value = value[1:]
+            if field == "data":
+                data.append(value)
+            elif field == "id":
+                event_id = value
+
+        return True
+
+    def _dispatch(self, data: str):
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return
+
+        self._events.put(event)
+        self._on_event()
+
+    def _disconnect(self):
+        with self._socket_lock:
+            sock = self._socket
+            self._socket = None
+        if not sock:
+            return
+
+        # shutting down the socket also unblocks a read on another thread
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
@@ -0,0 +1,162 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+import xbmc  # pylint: disable=import-error
+
+from lib.client import ProviderClient
+from lib.utils import get_profile_path, log
+
+
+class ResponseCache:
+    # maximum size in bytes of all cached response bodies
+    DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, filename: str, max_size: int = DEFAULT_MAX_SIZE):
+        if not filename:
+            raise ValueError("invalid filename")
+        if max_size <= 0:
+            raise ValueError("invalid max_size")
+
+        self._filename = filename
+        self._max_size = max_size
+
+        self._db = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def fetch(
+        self, client: ProviderClient, provider_id: str, endpoint: str, media_type: str = "", timeout: float = None
+    ) -> ProviderClient.Response:
+        if not client:
+            raise ValueError("invalid client")
+        if not provider_id:
+            raise ValueError("invalid provider_id")
+
+        key = (provider_id, endpoint, media_type)
+
+        # revalidate the cached response (if any) with the media provider
+        headers = {}
+        cached = self._lookup(key)
+        if cached:
+            (etag, last_modified, body) = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = client.get(endpoint, headers=headers, timeout=timeout)
+
+        # the cached response is still up to date
+        if response.status == 304 and cached:
+            with self._lock:
+                self.hits += 1
+                self._execute(
+                    "UPDATE responses SET accessed = ? WHERE provider = ? AND endpoint = ? AND mediatype = ?",
+                    (time.time(), *key),
+                )
+
+            return ProviderClient.Response(200, response.headers, body)
+
+        with self._lock:
+            self.misses += 1
+
+        # only responses which can be revalidated are worth caching
+        if response.status == 200 and ("etag" in response.headers or "last-modified" in response.headers):
+            self._store(key, response)
+
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def clear(self, provider_id: str = None):
+        with self._lock:
+            if provider_id:
+                self._execute("DELETE FROM responses WHERE provider = ?", (provider_id,))
+            else:
+                self._execute("DELETE FROM responses")
+
+    def _lookup(self, key: tuple) -> tuple:
+        with self._lock:
+            return self._execute(
+                "SELECT etag, lastmodified, body FROM responses WHERE provider = ? AND endpoint = ? AND mediatype = ?",
+                key,
+            ).fetchone()
+
+    def _store(self, key: tuple, response: ProviderClient.Response):
+        body = response.body
+        if len(body) > self._max_size:
+            return
+
+        with self._lock:
+            self._execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    *key,
+                    response.headers.get("etag"),
+                    response.headers.get("last-modified"),
+                    sqlite3.Binary(body),
+                    len(body),
+                    time.time(),
+                ),
+            )
+            self._evict()
+
+    def _evict(self):
+        # remove the least recently used responses until the cache fits into its maximum size
+        (size,) = self._execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if size <= self._max_size:
+            return
+
+        evicted = []
+        for (rowid, entry_size) in self._execute("SELECT rowid, size FROM responses ORDER BY accessed").fetchall():
+            if size <= self._max_size:
+                break
+
+            evicted.append((rowid,))
+            size -= entry_size
+
+        self._db.executemany("DELETE FROM responses WHERE rowid = ?", evicted)
+        self._db.commit()
+        self.evictions += len(evicted)
+
+    def _execute(self, statement: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        self._open()
+
+        cursor = self._db.execute(statement, parameters)
+        self._db.commit()
+
+        return cursor
+
+    def _open(self):
+        if self._db:
+            return
+
+        path = get_profile_path(self._filename)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "provider TEXT, endpoint TEXT, mediatype TEXT, etag TEXT, lastmodified TEXT, body BLOB, size INTEGER, "
+            "accessed REAL, PRIMARY KEY (provider, endpoint, mediatype))"
+        )
+        self._db.commit()
+
+        log(f"response cache opened from {path}", xbmc.LOGDEBUG)
+
+
+# responses of media providers which can be revalidated using ETag / Last-Modified
+response_cache = ResponseCache("responses.db")
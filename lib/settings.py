@@ -6,11 +6,33 @@
 #  See LICENSES/README.md for more information.
 #
 
+from datetime import datetime
+import hashlib
+import json
+from typing import List, Tuple
+
 import xbmcaddon  # pylint: disable=import-error
 import xbmcmediaimport  # pylint: disable=import-error
 
+from lib.utils import utc
+
+
+def _fingerprint(*values) -> str:
+    return hashlib.sha256(json.dumps(values).encode("utf-8")).hexdigest()
+
 
 class ProviderSettings:
+    # TODO(stub): add all settings which influence whether the media provider is ready / can be found
+    FINGERPRINT_SETTINGS = ("stub.url", "stub.username", "stub.password")
+
+    @staticmethod
+    def get_fingerprint(obj) -> str:
+        provider_settings = ProviderSettings._get_provider_settings(obj)
+
+        return _fingerprint(
+            *[provider_settings.getString(setting) for setting in ProviderSettings.FINGERPRINT_SETTINGS]
+        )
+
     @staticmethod
     def get_url(obj) -> str:
         provider_settings = ProviderSettings._get_provider_settings(obj)
@@ -32,6 +54,22 @@ class ProviderSettings:
 
         provider_settings.setString("stub.url", url)
 
+    @staticmethod
+    def get_path_substitutions(obj) -> List[Tuple[str, str]]:
+        provider_settings = ProviderSettings._get_provider_settings(obj)
+
+        # "<path on the media provider> => <path in Kodi>" entries separated by "|"
+        substitutions = []
+        for substitution in provider_settings.getString("stub.pathsubstitutions").split("|"):
+            source, separator, target = substitution.partition("=>")
+            source = source.strip()
+            if not separator or not source:
+                continue
+
+            substitutions.append((source, target.strip()))
+
+        return substitutions
+
     @staticmethod
     def _get_provider_settings(obj) -> xbmcaddon.Settings:
         if not obj:
@@ -44,3 +82,88 @@ class ProviderSettings:
             return provider_settings
 
         return obj
+
+
+class ImportSettings:
+    SYNC_CURSOR_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+    @staticmethod
+    def get_fingerprint(obj) -> str:
+        import_settings = ImportSettings._get_import_settings(obj)
+
+        # TODO(stub): add all settings which influence whether the media import is ready
+        return _fingerprint(
+            import_settings.getStringList("stub.importviews"),
+            import_settings.getBool("stub.importcollections"),
+        )
+
+    @staticmethod
+    def get_sync_cursor(obj) -> datetime:
+        import_settings = ImportSettings._get_import_settings(obj)
+
+        sync_cursor = import_settings.getString("stub.synccursor")
+        if not sync_cursor:
+            return None
+
+        try:
+            sync_cursor = datetime.strptime(sync_cursor, ImportSettings.SYNC_CURSOR_FORMAT).replace(tzinfo=utc)
+        except ValueError:
+            return None
+
+        # a sync cursor from the future cannot be trusted
+        if sync_cursor > datetime.now(utc):
+            return None
+
+        return sync_cursor
+
+    @staticmethod
+    def set_sync_cursor(obj, sync_cursor: datetime, save: bool = True):
+        if not sync_cursor:
+            raise ValueError("invalid sync_cursor")
+
+        import_settings = ImportSettings._get_import_settings(obj)
+
+        import_settings.setString(
+            "stub.synccursor", sync_cursor.astimezone(utc).strftime(ImportSettings.SYNC_CURSOR_FORMAT)
+        )
+        if save:
+            import_settings.save()
+
+    @staticmethod
+    def reset_sync_cursor(obj, save: bool = True):
+        import_settings = ImportSettings._get_import_settings(obj)
+
+        import_settings.setString("stub.synccursor", "")
+        if save:
+            import_settings.save()
+
+    @staticmethod
+    def get_fingerprint_generation(obj) -> str:
+        import_settings = ImportSettings._get_import_settings(obj)
+
+        # ties the fingerprints of the imported items (see lib.fingerprints) to this media import
+        return import_settings.getString("stub.fingerprintgeneration")
+
+    @staticmethod
+    def set_fingerprint_generation(obj, generation: str, save: bool = True):
+        if not generation:
+            raise ValueError("invalid generation")
+
+        import_settings = ImportSettings._get_import_settings(obj)
+
+        import_settings.setString("stub.fingerprintgeneration", generation)
+        if save:
+            import_settings.save()
+
+    @staticmethod
+    def _get_import_settings(obj) -> xbmcaddon.Settings:
+        if not obj:
+            raise ValueError("invalid media import or media import settings")
+
+        if isinstance(obj, xbmcmediaimport.MediaImport):
+            import_settings = obj.getSettings()
+            if not import_settings:
+                raise ValueError("invalid import without settings")
+            return import_settings
+
+        return obj
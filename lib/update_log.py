@@ -0,0 +1,211 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+from contextlib import contextmanager
+import json
+import os
+import threading
+from typing import Dict, Iterator, List
+import uuid
+
+import xbmc  # pylint: disable=import-error
+
+from lib.utils import get_profile_path, log
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows where the log is therefore never compacted
+    fcntl = None
+
+
+class UpdateLog:
+    # compact the log once it contains this many more records than pending updates
+    COMPACTION_THRESHOLD = 1000
+
+    def __init__(self, filename: str, compaction_threshold: int = COMPACTION_THRESHOLD):
+        if not filename:
+            raise ValueError("invalid filename")
+
+        self._filename = filename
+        self._compaction_threshold = compaction_threshold
+
+        self._path = None
+        # (provider URL, item ID) => (sequence number, update)
+        self._pending = {}
+        self._sequence = 0
+        self._records = 0
+        # the log is shared by multiple interpreters (e.g. the observer service and importer actions)
+        # so the records appended by others are read (from the offset) before every access
+        # (device, inode, first record) of the log file
+        self._file_id = None
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def append(self, url: str, item_id: str, update: Dict) -> int:
+        with self._lock, self._file_lock():
+            self._refresh()
+
+            sequence = self._sequence + 1
+            self._write([{"seq": sequence, "url": url, "id": item_id, "update": update}])
+
+            return sequence
+
+    def acknowledge(self, url: str, acknowledged: Dict[str, int]):
+        # acknowledged: item ID => sequence number of the update which has been accepted by the media provider
+        with self._lock, self._file_lock() as locked:
+            self._refresh()
+
+            records = []
+            for item_id, sequence in acknowledged.items():
+                pending = self._pending.get((url, item_id))
+                # a newer update might have been appended in the meantime
+                if not pending or pending[0] > sequence:
+                    continue
+
+                records.append({"ack": sequence, "url": url, "id": item_id})
+
+            if records:
+                self._write(records)
+
+            # the log can only be rewritten if no other interpreter can append to it in the meantime
+            if locked and self._records - len(self._pending) > self._compaction_threshold:
+                self._compact()
+
+    def has_pending(self, url: str) -> bool:
+        with self._lock:
+            self._refresh()
+
+            return any(pending_url == url for (pending_url, _) in self._pending)
+
+    def pending(self, url: str) -> Dict[str, tuple]:
+        # item ID => (sequence number, update)
+        with self._lock:
+            self._refresh()
+
+            return {
+                item_id: pending for ((pending_url, item_id), pending) in self._pending.items() if pending_url == url
+            }
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[bool]:
+        # yields whether other interpreters are locked out from writing to the log
+        if not self._path:
+            self._path = get_profile_path(self._filename)
+        if not fcntl:
+            yield False
+            return
+
+        with open(f"{self._path}.lock", "a", encoding="utf-8") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _refresh(self):
+        if not self._path:
+            self._path = get_profile_path(self._filename)
+
+        try:
+            log_file = open(self._path, "rb")  # pylint: disable=consider-using-with
+        except FileNotFoundError:
+            self._reset(None)
+            return
+
+        with log_file:
+            stat = os.fstat(log_file.fileno())
+            # a compacted log starts with a unique record because it might re-use the inode of a previous log
+            file_id = (stat.st_dev, stat.st_ino, log_file.readline())
+            if file_id != self._file_id or stat.st_size < self._offset:
+                # the log has been compacted (or removed) by another interpreter
+                self._reset(file_id)
+
+            if stat.st_size == self._offset:
+                return
+
+            loaded = self._offset == 0
+            log_file.seek(self._offset)
+            for line in log_file:
+                # a record which is still being written is read once it is complete
+                if not line.endswith(b"\n"):
+                    break
+
+                self._offset += len(line)
+                self._records += 1
+                try:
+                    record = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    # ignore a partially written record
+                    continue
+
+                self._apply(record)
+
+        if loaded:
+            log(f"{len(self._pending)} pending updates loaded from {self._path}", xbmc.LOGDEBUG)
+
+    def _reset(self, file_id: tuple):
+        # the sequence number is kept to never re-use it
+        self._pending = {}
+        self._records = 0
+        self._file_id = file_id
+        self._offset = 0
+
+    def _apply(self, record: Dict):
+        if "ack" in record:
+            key = (record["url"], record["id"])
+            pending = self._pending.get(key)
+            if pending and pending[0] <= record["ack"]:
+                del self._pending[key]
+            return
+
+        self._sequence = max(self._sequence, record["seq"])
+        # the sequence number is kept when compacting the log even if there are no pending updates left
+        if "url" not in record:
+            return
+
+        key = (record["url"], record["id"])
+        pending = self._pending.get(key)
+        if not pending or pending[0] < record["seq"]:
+            self._pending[key] = (record["seq"], record["update"])
+
+    def _write(self, records: List[Dict]):
+        with open(self._path, "ab") as log_file:
+            # terminate a record which has only partially been written (e.g. by a crashed interpreter)
+            if log_file.tell() > self._offset:
+                log_file.write(b"\n")
+            for record in records:
+                log_file.write(json.dumps(record).encode("utf-8") + b"\n")
+            log_file.flush()
+            os.fsync(log_file.fileno())
+
+        # apply the written records (and any records appended by others in the meantime)
+        self._refresh()
+
+    def _compact(self):
+        # only keep the newest pending update per item
+        compacted_path = f"{self._path}.tmp"
+        header = json.dumps({"seq": self._sequence, "log": uuid.uuid4().hex}).encode("utf-8") + b"\n"
+        with open(compacted_path, "wb") as log_file:
+            log_file.write(header)
+            for (url, item_id), (sequence, update) in self._pending.items():
+                record = {"seq": sequence, "url": url, "id": item_id, "update": update}
+                log_file.write(json.dumps(record).encode("utf-8") + b"\n")
+            log_file.flush()
+            os.fsync(log_file.fileno())
+
+            stat = os.fstat(log_file.fileno())
+
+        os.replace(compacted_path, self._path)
+        self._file_id = (stat.st_dev, stat.st_ino, header)
+        self._offset = stat.st_size
+        self._records = len(self._pending) + 1
+
+
+# playback updates which haven't been accepted by the media provider yet
+update_log = UpdateLog("updates.wal")
@@ -0,0 +1,186 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+import threading
+import time
+from typing import Dict
+
+import xbmc  # pylint: disable=import-error
+
+from lib.client import ProviderClient
+from lib.update_log import UpdateLog, update_log
+from lib.utils import log
+
+
+class PlaybackUpdate:  # pylint: disable=too-few-public-methods
+    def __init__(self, item_id: str, playcount: int, lastplayed: str, resume_time: float, total_time: float):
+        if not item_id:
+            raise ValueError("invalid item_id")
+
+        self.item_id = item_id
+        self.playcount = playcount
+        self.lastplayed = lastplayed
+        self.resume_time = resume_time
+        self.total_time = total_time
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.item_id,
+            "playcount": self.playcount,
+            "lastplayed": self.lastplayed,
+            "resumetime": self.resume_time,
+            "totaltime": self.total_time,
+        }
+
+    @staticmethod
+    def from_dict(obj: Dict) -> "PlaybackUpdate":
+        return PlaybackUpdate(obj["id"], obj["playcount"], obj["lastplayed"], obj["resumetime"], obj["totaltime"])
+
+
+def send_playback_updates(client: ProviderClient, updates: Dict[str, PlaybackUpdate]) -> bool:
+    # TODO(stub): send all playback updates (playcount, last played, resume point) to the media provider
+    #             using as few (bulk) requests as possible and return whether they have been accepted
+    log(f"sending {len(updates)} playback updates to {client.url}", xbmc.LOGDEBUG)
+    return True
+
+
+class UpdateQueue:
+    # time in seconds to wait for additional updates before sending them to the media provider
+    DEBOUNCE = 2.0
+    # maximum time in seconds an update is delayed by consecutive updates
+    MAX_DELAY = 10.0
+
+    def __init__(self, wal: UpdateLog, debounce: float = DEBOUNCE, max_delay: float = MAX_DELAY):
+        if not wal:
+            raise ValueError("invalid wal")
+        if debounce < 0 or max_delay < debounce:
+            raise ValueError("invalid debounce or max_delay")
+
+        self._wal = wal
+        self._debounce = debounce
+        self._max_delay = max_delay
+
+        # provider URL => (client, item ID => (sequence number in the update log, latest playback update))
+        self._pending = {}
+        self._first_pending = None
+        self._timer = None
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        # only delay and coalesce updates in a long-running process (i.e. the observer service)
+        with self._lock:
+            self._started = True
+
+    def stop(self):
+        with self._lock:
+            self._started = False
+            self._cancel_timer()
+
+        self.flush()
+
+    def persist(self, url: str, update: PlaybackUpdate) -> int:
+        if not url:
+            raise ValueError("invalid url")
+        if not update:
+            raise ValueError("invalid update")
+
+        # returns the sequence number of the update in the update log
+        return self._wal.append(url, update.item_id, update.to_dict())
+
+    def enqueue(self, client: ProviderClient, update: PlaybackUpdate, sequence: int = None):
+        if not client:
+            raise ValueError("invalid client")
+        if not update:
+            raise ValueError("invalid update")
+
+        # persist the update first (unless it already has been) so that it doesn't get lost if it cannot be sent
+        if sequence is None:
+            sequence = self.persist(client.url, update)
+
+        with self._lock:
+            if client.url not in self._pending:
+                self._pending[client.url] = (client, {})
+
+            # only the latest playback state of an item has to be sent
+            self._pending[client.url][1][update.item_id] = (sequence, update)
+
+            if self._started:
+                self._schedule_flush()
+                return
+
+        self.flush()
+
+    def flush(self) -> bool:
+        with self._lock:
+            self._cancel_timer()
+            pending = self._pending
+            self._pending = {}
+            self._first_pending = None
+
+        success = True
+        for client, updates in pending.values():
+            success = self._send(client, updates) and success
+
+        return success
+
+    def replay(self, client: ProviderClient) -> bool:
+        # send all updates which couldn't be sent to the media provider before
+        pending = self._wal.pending(client.url)
+
+        # updates which are still queued are sent once the queue is flushed
+        with self._lock:
+            if client.url in self._pending:
+                queued = self._pending[client.url][1]
+                pending = {item_id: update for (item_id, update) in pending.items() if item_id not in queued}
+
+        if not pending:
+            return True
+
+        updates = {
+            item_id: (sequence, PlaybackUpdate.from_dict(update)) for (item_id, (sequence, update)) in pending.items()
+        }
+        log(f"replaying {len(updates)} pending playback updates to {client.url}")
+        return self._send(client, updates)
+
+    def _send(self, client: ProviderClient, updates: Dict[str, tuple]) -> bool:
+        try:
+            success = send_playback_updates(client, {item_id: update for (item_id, (_, update)) in updates.items()})
+        except Exception as e:  # pylint: disable=broad-except
+            log(f"failed to send {len(updates)} playback updates to {client.url}: {e}", xbmc.LOGWARNING)
+            success = False
+
+        if not success:
+            log(f"{len(updates)} playback updates for {client.url} kept for replaying them later", xbmc.LOGWARNING)
+            return False
+
+        self._wal.acknowledge(client.url, {item_id: sequence for (item_id, (sequence, _)) in updates.items()})
+        log(f"{len(updates)} playback updates sent to {client.url}")
+        return True
+
+    def _schedule_flush(self):
+        now = time.monotonic()
+        if self._first_pending is None:
+            self._first_pending = now
+
+        # restart the debounce window unless the oldest update would be delayed for too long
+        delay = min(self._debounce, self._first_pending + self._max_delay - now)
+
+        self._cancel_timer()
+        self._timer = threading.Timer(max(delay, 0), self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+
+# shared by the importer actions executed by the action server and the observer service
+update_queue = UpdateQueue(update_log)
@@ -6,6 +6,9 @@
 #  See LICENSES/README.md for more information.
 #
 
+from itertools import islice
+import os
+from typing import Iterable, Iterator, List
 import unicodedata
 
 from six import PY3
@@ -13,6 +16,7 @@ from six import PY3
 import xbmc  # pylint: disable=import-error
 import xbmcaddon  # pylint: disable=import-error
 import xbmcmediaimport  # pylint: disable=import-error
+import xbmcvfs  # pylint: disable=import-error
 
 __addon__ = xbmcaddon.Addon()
 __addonid__ = __addon__.getAddonInfo("id")
@@ -53,6 +57,14 @@ def localize(identifier: int) -> str:
     return normalize_string(__addon__.getLocalizedString(identifier))
 
 
+def get_profile_path(*paths: str) -> str:
+    profile_path = xbmcvfs.translatePath(__addon__.getAddonInfo("profile"))
+    if not xbmcvfs.exists(profile_path):
+        xbmcvfs.mkdirs(profile_path)
+
+    return os.path.join(profile_path, *paths)
+
+
 def provider2str(media_provider: xbmcmediaimport.MediaProvider) -> str:
     if not media_provider:
         return "unknown media provider"
@@ -67,6 +79,19 @@ def import2str(media_import: xbmcmediaimport.MediaImport) -> str:
     return f"{provider2str(media_import.getProvider())} {media_import.getMediaTypes()}"
 
 
+def batch(iterable: Iterable, size: int) -> Iterator[List]:
+    if size <= 0:
+        raise ValueError("invalid batch size")
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+
+        yield chunk
+
+
 try:
     from datetime import timezone
 
@@ -0,0 +1,64 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+import threading
+import time
+
+
+class ValidationCache:
+    # time in seconds after which a cached result has to be validated again
+    DEFAULT_TTL = 300
+
+    # cached checks
+    CHECK_PROVIDER_READY = "providerready"
+    CHECK_PROVIDER_FOUND = "providerfound"
+    CHECK_IMPORT_READY = "importready"
+    CHECK_VIEWS = "views"
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        if ttl <= 0:
+            raise ValueError("invalid ttl")
+
+        self._ttl = ttl
+        # (owner, check) => (fingerprint, expiry, result)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, owner: str, check: str, fingerprint: str):
+        with self._lock:
+            entry = self._entries.get((owner, check))
+            if not entry:
+                return None
+
+            (entry_fingerprint, expiry, result) = entry
+            # the settings have changed or the result is outdated
+            if entry_fingerprint != fingerprint or expiry < time.monotonic():
+                del self._entries[(owner, check)]
+                return None
+
+            return result
+
+    def set(self, owner: str, check: str, fingerprint: str, result):
+        if result is None:
+            raise ValueError("invalid result")
+
+        with self._lock:
+            self._entries[(owner, check)] = (fingerprint, time.monotonic() + self._ttl, result)
+
+    def invalidate(self, owner: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == owner]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# the cache is only kept across actions if they are executed by the action server of the observer service
+validation_cache = ValidationCache()
@@ -0,0 +1,24 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# the tests run outside of Kodi using the stand-in Kodi modules from tests/stubs
+
+import os
+import sys
+import tempfile
+
+TESTS_PATH = os.path.dirname(os.path.abspath(__file__))
+STUBS_PATH = os.path.join(TESTS_PATH, "stubs")
+ROOT_PATH = os.path.dirname(TESTS_PATH)
+
+for path in (STUBS_PATH, ROOT_PATH):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# keep the add-on profile (databases, logs, sockets) of the tests out of the way
+os.environ.setdefault("KODI_STUB_PROFILE", tempfile.mkdtemp(prefix="mediaimporter.stub-"))
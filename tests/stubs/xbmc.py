@@ -0,0 +1,34 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# stand-in for Kodi's xbmc module to run the tests outside of Kodi
+
+LOGDEBUG = 0
+LOGINFO = 1
+LOGWARNING = 2
+LOGERROR = 3
+LOGFATAL = 4
+
+# log messages as (message, level)
+messages = []
+
+
+def log(message, level=LOGDEBUG):
+    messages.append((message, level))
+
+
+def executeJSONRPC(request):  # pylint: disable=invalid-name,unused-argument
+    return "{}"
+
+
+class Monitor:
+    def abortRequested(self):  # pylint: disable=invalid-name
+        return False
+
+    def waitForAbort(self, timeout=-1):  # pylint: disable=invalid-name,unused-argument
+        return False
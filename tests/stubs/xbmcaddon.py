@@ -0,0 +1,46 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# stand-in for Kodi's xbmcaddon module to run the tests outside of Kodi
+
+import os
+import tempfile
+
+
+class Addon:
+    def __init__(self, addon_id="mediaimporter.stub"):
+        self._info = {
+            "id": addon_id,
+            "profile": os.environ.get("KODI_STUB_PROFILE") or tempfile.mkdtemp(prefix="mediaimporter.stub-"),
+        }
+
+    def getAddonInfo(self, key):  # pylint: disable=invalid-name
+        return self._info[key]
+
+    def getLocalizedString(self, identifier):  # pylint: disable=invalid-name
+        return f"{identifier} {{}}"
+
+
+class Settings:
+    def __init__(self, values=None):
+        self._values = dict(values or {})
+
+    def getString(self, key):  # pylint: disable=invalid-name
+        return self._values.get(key, "")
+
+    def setString(self, key, value):  # pylint: disable=invalid-name
+        self._values[key] = value
+
+    def getBool(self, key):  # pylint: disable=invalid-name
+        return bool(self._values.get(key, False))
+
+    def getStringList(self, key):  # pylint: disable=invalid-name
+        return list(self._values.get(key, []))
+
+    def save(self):
+        pass
@@ -0,0 +1,78 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# stand-in for Kodi's xbmcgui module to run the tests outside of Kodi
+
+
+class InfoTagVideo:
+    def __init__(self):
+        self.info = {}
+        self.unique_ids = {}
+
+    def getMediaType(self):  # pylint: disable=invalid-name
+        return self.info.get("mediatype", "")
+
+    def getDbId(self):  # pylint: disable=invalid-name
+        return self.info.get("dbid", -1)
+
+    def getUniqueID(self, key):  # pylint: disable=invalid-name
+        return self.unique_ids.get(key, "")
+
+    def setUniqueIDs(self, unique_ids, default=""):  # pylint: disable=invalid-name,unused-argument
+        self.unique_ids.update(unique_ids)
+
+    def getPlayCount(self):  # pylint: disable=invalid-name
+        return self.info.get("playcount", 0)
+
+    def getLastPlayed(self):  # pylint: disable=invalid-name
+        return self.info.get("lastplayed", "")
+
+    def getResumeTime(self):  # pylint: disable=invalid-name
+        return self.info.get("resumetime", 0.0)
+
+    def getResumeTimeTotal(self):  # pylint: disable=invalid-name
+        return self.info.get("totaltime", 0.0)
+
+
+class ListItem:
+    def __init__(self, label="", label2="", path="", offscreen=False):  # pylint: disable=unused-argument
+        self._label = label
+        self._path = path
+        self._date_time = ""
+        self._tag = InfoTagVideo()
+        self.cast = []
+        self.properties = {}
+        # (stream type, stream details)
+        self.streams = []
+
+    def getLabel(self):  # pylint: disable=invalid-name
+        return self._label
+
+    def getPath(self):  # pylint: disable=invalid-name
+        return self._path
+
+    def setInfo(self, media, info):  # pylint: disable=invalid-name,unused-argument
+        self._tag.info.update(info)
+
+    def getVideoInfoTag(self):  # pylint: disable=invalid-name
+        return self._tag
+
+    def getDateTime(self):  # pylint: disable=invalid-name
+        return self._date_time
+
+    def setDateTime(self, date_time):  # pylint: disable=invalid-name
+        self._date_time = date_time
+
+    def setCast(self, cast):  # pylint: disable=invalid-name
+        self.cast = list(cast)
+
+    def setProperties(self, properties):  # pylint: disable=invalid-name
+        self.properties.update(properties)
+
+    def addStreamInfo(self, stream_type, stream):  # pylint: disable=invalid-name
+        self.streams.append((stream_type, stream))
@@ -0,0 +1,107 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# stand-in for Kodi's xbmcmediaimport module to run the tests outside of Kodi
+
+MediaTypeMovie = "movie"
+MediaTypeVideoCollection = "set"
+MediaTypeMusicVideo = "musicvideo"
+MediaTypeTvShow = "tvshow"
+MediaTypeSeason = "season"
+MediaTypeEpisode = "episode"
+
+MediaImportChangesetTypeNone = 0
+MediaImportChangesetTypeAdded = 1
+MediaImportChangesetTypeChanged = 2
+MediaImportChangesetTypeRemoved = 3
+
+# calls of the functions below as (function name, arguments)
+calls = []
+# media imports and updated items per handle
+imports = {}
+updated_items = {}
+
+
+def _record(name):
+    def record(*args):
+        calls.append((name, args))
+        return True
+
+    return record
+
+
+class MediaProvider:
+    def __init__(self, identifier="stub", friendly_name="Stub", icon_url="", media_types=(), settings=None):
+        self._identifier = identifier
+        self._friendly_name = friendly_name
+        self._settings = settings
+
+    def getIdentifier(self):  # pylint: disable=invalid-name
+        return self._identifier
+
+    def getFriendlyName(self):  # pylint: disable=invalid-name
+        return self._friendly_name
+
+    def getSettings(self):  # pylint: disable=invalid-name
+        return self._settings
+
+    def prepareSettings(self):  # pylint: disable=invalid-name
+        return self._settings
+
+
+class MediaImport:
+    def __init__(self, provider=None, media_types=(), settings=None):
+        self._provider = provider
+        self._media_types = list(media_types)
+        self._settings = settings
+
+    def getProvider(self):  # pylint: disable=invalid-name
+        return self._provider
+
+    def getMediaTypes(self):  # pylint: disable=invalid-name
+        return self._media_types
+
+    def getSettings(self):  # pylint: disable=invalid-name
+        return self._settings
+
+    def prepareSettings(self):  # pylint: disable=invalid-name
+        return self._settings
+
+
+class Observer:
+    pass
+
+
+for _name in (
+    "addImportItems",
+    "changeImportedItems",
+    "finishImport",
+    "finishUpdate_on_provider",
+    "setCanImport",
+    "setCanUpdateLastPlayedOnProvider",
+    "setCanUpdateMetadataOnProvider",
+    "setCanUpdatePlaycountOnProvider",
+    "setCanUpdateResumePositionOnProvider",
+    "setImportReady",
+    "setProgressStatus",
+    "setProviderFound",
+    "setProviderReady",
+):
+    globals()[_name] = _record(_name)
+
+
+def shouldCancel(handle, progress, total):  # pylint: disable=invalid-name,unused-argument
+    return False
+
+
+def getImport(handle):  # pylint: disable=invalid-name
+    return imports.get(handle)
+
+
+def getUpdatedItem(handle):  # pylint: disable=invalid-name
+    return updated_items.get(handle)
@@ -0,0 +1,171 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# tests of lib.client.ProviderClient against a stand-in media provider
+
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+import pytest
+
+from lib.client import ProviderClient
+
+
+class StandInProvider(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInProvider.Handler)
+        self.connections = 0
+        self.requests = []
+        # number of requests after which a connection is dropped without responding (0 = never)
+        self.drop_after = 0
+        # time in seconds to wait before responding to POST requests
+        self.post_delay = 0.0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        # clients giving up on a request (e.g. after a timeout) are expected
+        pass
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # send the headers and the body of a response at once
+        wbufsize = -1
+
+        def setup(self):
+            super().setup()
+            self.requests_handled = 0  # pylint: disable=attribute-defined-outside-init
+            with self.server._lock:  # pylint: disable=protected-access
+                self.server.connections += 1
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            pass
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            self._respond()
+
+        def do_POST(self):  # pylint: disable=invalid-name
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._respond(delay=self.server.post_delay)
+
+        def _respond(self, delay: float = 0.0):
+            with self.server._lock:  # pylint: disable=protected-access
+                self.server.requests.append((self.command, self.path))
+
+            self.requests_handled += 1  # pylint: disable=attribute-defined-outside-init
+            if self.server.drop_after and self.requests_handled > self.server.drop_after:
+                # simulate a media provider closing an idle keep-alive connection
+                self.close_connection = True
+                return
+
+            time.sleep(delay)
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+
+@pytest.fixture(name="provider")
+def fixture_provider():
+    provider = StandInProvider()
+    yield provider
+    provider.close()
+
+
+def test_sequential_requests_reuse_one_connection(provider):
+    client = ProviderClient(provider.url)
+
+    for _ in range(20):
+        assert client.get("/items").status == 200
+
+    assert len(provider.requests) == 20
+    assert provider.connections == 1
+
+
+def test_concurrent_requests_are_limited_to_max_connections(provider):
+    client = ProviderClient(provider.url, max_connections=4)
+
+    responses = client.request_all([("GET", f"/items?page={page}") for page in range(32)])
+
+    assert [response.status for response in responses] == [200] * 32
+    assert provider.connections <= 4
+
+
+def test_idempotent_request_is_retried_on_stale_connection(provider):
+    provider.drop_after = 1
+    client = ProviderClient(provider.url)
+
+    assert client.get("/items").status == 200
+    # the pooled connection is dropped by the media provider when receiving the next request
+    assert client.get("/items").status == 200
+
+    assert provider.connections == 2
+
+
+def test_post_is_not_retried_on_stale_connection(provider):
+    provider.drop_after = 1
+    client = ProviderClient(provider.url)
+
+    assert client.get("/items").status == 200
+    with pytest.raises(http.client.RemoteDisconnected):
+        client.request("POST", "/updates", body=b"{}")
+
+    # the media provider has received the POST request exactly once
+    assert provider.requests.count(("POST", "/updates")) == 1
+
+
+def test_post_is_not_retried_on_timeout(provider):
+    provider.post_delay = 2.0
+    client = ProviderClient(provider.url)
+
+    assert client.get("/items").status == 200
+    start = time.monotonic()
+    with pytest.raises(OSError):
+        client.request("POST", "/updates", body=b"{}", timeout=0.5)
+    duration = time.monotonic() - start
+
+    assert provider.requests.count(("POST", "/updates")) == 1
+    assert duration < 1.0
+
+
+def test_connection_reuse_benchmark(provider):
+    requests = 200
+
+    client = ProviderClient(provider.url)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get("/items")
+    pooled = time.perf_counter() - start
+    pooled_connections = provider.connections
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        # a new client per request doesn't have any pooled connections
+        ProviderClient(provider.url).get("/items", headers={"Connection": "close"})
+    unpooled = time.perf_counter() - start
+
+    print(
+        f"\n{requests} requests: {pooled * 1000:.1f}ms on {pooled_connections} pooled connection(s), "
+        f"{unpooled * 1000:.1f}ms on {provider.connections - pooled_connections} new connections"
+    )
+    assert pooled_connections == 1
@@ -0,0 +1,171 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# tests of the importer actions called by Kodi with the stand-in xbmcmediaimport module
+
+from typing import Dict, List
+
+import pytest
+
+import xbmcaddon  # pylint: disable=import-error
+import xbmcgui  # pylint: disable=import-error
+import xbmcmediaimport  # pylint: disable=import-error
+
+from lib import importer
+from lib.kodi import Api
+from lib.settings import ImportSettings
+from lib.update_log import update_log
+
+HANDLE = 1
+MEDIA_TYPES = [xbmcmediaimport.MediaTypeMovie, xbmcmediaimport.MediaTypeTvShow]
+
+
+@pytest.fixture(name="kodi")
+def fixture_kodi():
+    xbmcmediaimport.calls.clear()
+    yield xbmcmediaimport
+    xbmcmediaimport.calls.clear()
+    xbmcmediaimport.imports.clear()
+    xbmcmediaimport.updated_items.clear()
+
+
+def _calls(name: str) -> list:
+    return [args for (call, args) in xbmcmediaimport.calls if call == name]
+
+
+def _media_import(
+    url: str, media_types=(xbmcmediaimport.MediaTypeMovie,), provider_id: str = "stub"
+) -> xbmcmediaimport.MediaImport:
+    provider = xbmcmediaimport.MediaProvider(provider_id, settings=xbmcaddon.Settings({"stub.url": url}))
+    return xbmcmediaimport.MediaImport(provider, media_types, xbmcaddon.Settings())
+
+
+def _updated_item(item_id: str) -> xbmcgui.ListItem:
+    item = xbmcgui.ListItem("Movie", path=f"http://provider/{item_id}.mkv")
+    item.setInfo("video", {"mediatype": xbmcmediaimport.MediaTypeMovie, "playcount": 1})
+    item.getVideoInfoTag().setUniqueIDs({"stub": item_id}, "stub")
+    return item
+
+
+@pytest.mark.parametrize("url", ["", "not a url"])
+def test_update_on_provider_with_invalid_settings(kodi, url):
+    kodi.imports[HANDLE] = _media_import(url)
+    kodi.updated_items[HANDLE] = _updated_item("invalid-settings")
+
+    importer.update_on_provider(HANDLE, {})
+
+    # the update hasn't been confirmed to Kodi
+    assert not _calls("finishUpdate_on_provider")
+
+
+def test_update_on_provider_persists_update_before_resolving_client(kodi):
+    kodi.imports[HANDLE] = _media_import("not a url")
+    kodi.updated_items[HANDLE] = _updated_item("unsupported-url")
+
+    importer.update_on_provider(HANDLE, {})
+
+    # the update is kept in the update log to be replayed once the media provider can be reached
+    assert update_log.pending("not a url")["unsupported-url"][1]["playcount"] == 1
+
+
+def test_update_on_provider(kodi):
+    kodi.imports[HANDLE] = _media_import("http://provider/")
+    kodi.updated_items[HANDLE] = _updated_item("sent")
+
+    importer.update_on_provider(HANDLE, {})
+
+    # the update has been sent immediately (outside of the observer service) and acknowledged
+    assert _calls("finishUpdate_on_provider") == [(HANDLE,)]
+    assert "sent" not in update_log.pending("http://provider/")
+
+
+@pytest.fixture(name="provider_items")
+def fixture_provider_items(monkeypatch):
+    # media type => item objects provided by the stand-in media provider
+    provider_items = {media_type: [] for media_type in MEDIA_TYPES}
+
+    # pylint: disable=unused-argument
+    def fetch_item_objs_page(media_provider, import_settings, media_type, index, sync_cursor=None):
+        if index > 0:
+            return []
+
+        return [
+            (xbmcmediaimport.MediaImportChangesetTypeNone, dict(item_obj)) for item_obj in provider_items[media_type]
+        ]
+
+    # pylint: disable=unused-argument
+    def to_file_item(item_obj, media_type="", allow_direct_play=True, interner=None, path_mapper=None):
+        return xbmcgui.ListItem(item_obj["title"], path=f"http://provider/{item_obj['id']}.mkv")
+
+    monkeypatch.setattr(importer, "_fetch_item_objs_page", fetch_item_objs_page)
+    # lib.utils.normalize_string() returns the localized strings as bytes outside of Kodi
+    monkeypatch.setattr(importer, "localize", lambda identifier: "{}")
+    monkeypatch.setattr(Api, "to_file_item", staticmethod(to_file_item))
+
+    return provider_items
+
+
+def _import(media_import: xbmcmediaimport.MediaImport) -> Dict[int, List[str]]:
+    # returns the paths of the items passed to Kodi per changeset type
+    xbmcmediaimport.calls.clear()
+    xbmcmediaimport.imports[HANDLE] = media_import
+
+    importer.exec_import(HANDLE, {"mediatypes": MEDIA_TYPES})
+
+    imported = {}
+    for (_, items, _, changeset_type) in _calls("addImportItems"):
+        imported.setdefault(changeset_type, []).extend(sorted(item.getPath() for item in items))
+    return imported
+
+
+def test_full_import_only_passes_changed_items(kodi, provider_items):  # pylint: disable=unused-argument
+    media_import = _media_import("http://provider/", MEDIA_TYPES, provider_id="full-imports")
+    provider_items[xbmcmediaimport.MediaTypeMovie] = [
+        {"id": "a", "title": "A"},
+        {"id": "b", "title": "B"},
+        {"id": "c", "title": "C"},
+    ]
+
+    assert _import(media_import) == {
+        xbmcmediaimport.MediaImportChangesetTypeNone: [
+            "http://provider/a.mkv",
+            "http://provider/b.mkv",
+            "http://provider/c.mkv",
+        ]
+    }
+    assert _calls("finishImport") == [(HANDLE, False)]
+
+    # another full import (without a sync cursor) only passes added, changed and removed items
+    ImportSettings.reset_sync_cursor(media_import.getSettings())
+    provider_items[xbmcmediaimport.MediaTypeMovie] = [
+        {"id": "a", "title": "A"},
+        {"id": "b", "title": "B (changed)"},
+        {"id": "d", "title": "D"},
+    ]
+
+    assert _import(media_import) == {
+        xbmcmediaimport.MediaImportChangesetTypeAdded: ["http://provider/d.mkv"],
+        xbmcmediaimport.MediaImportChangesetTypeChanged: ["http://provider/b.mkv"],
+        xbmcmediaimport.MediaImportChangesetTypeRemoved: ["http://provider/c.mkv"],
+    }
+    assert _calls("finishImport") == [(HANDLE, True)]
+
+
+def test_force_sync_keeps_fingerprints(kodi, provider_items):
+    media_import = _media_import("http://provider/", MEDIA_TYPES, provider_id="force-sync")
+    provider_items[xbmcmediaimport.MediaTypeMovie] = [{"id": "a", "title": "A"}]
+
+    assert _import(media_import) == {xbmcmediaimport.MediaImportChangesetTypeNone: ["http://provider/a.mkv"]}
+
+    kodi.imports[HANDLE] = media_import
+    importer.force_sync(HANDLE, {})
+    assert ImportSettings.get_sync_cursor(media_import.getSettings()) is None
+
+    # the forced full import retrieves all items but none of them has changed
+    assert not _import(media_import)
+    assert _calls("finishImport") == [(HANDLE, True)]
@@ -0,0 +1,85 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# tests of lib.json_stream.iter_json_items with JSON documents received in arbitrary chunks
+
+import gzip
+import json
+import zlib
+
+import pytest
+
+from lib.json_stream import iter_json_items
+
+ITEMS = [
+    {"id": "1", "title": "Movie", "year": 2021, "rating": 7.25, "tags": ["a", "b"]},
+    {"id": "2", "title": "Amélie ☕", "year": 2001, "rating": None, "nested": {"items": [1, 2]}},
+    {"id": "3", "title": "", "year": 123456789, "rating": -0.5, "watched": True},
+]
+
+
+def _compress(data: bytes, content_encoding: str) -> bytes:
+    if content_encoding == "gzip":
+        return gzip.compress(data)
+    if content_encoding == "deflate":
+        return zlib.compress(data)
+    if content_encoding == "raw-deflate":
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    return data
+
+
+def _chunks(data: bytes, size: int) -> list:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("content_encoding", [None, "gzip", "deflate", "raw-deflate"])
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024 * 1024])
+def test_items(content_encoding, chunk_size):
+    data = _compress(json.dumps(ITEMS).encode("utf-8"), content_encoding)
+
+    # raw deflate data is announced as "deflate" as well
+    encoding = "deflate" if content_encoding == "raw-deflate" else content_encoding
+    assert list(iter_json_items(_chunks(data, chunk_size), content_encoding=encoding)) == ITEMS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1024 * 1024])
+def test_items_key(chunk_size):
+    document = {
+        "status": "ok, [items]",
+        "items_count": 3,
+        "meta": {"items": [{"id": "not an item"}], "paging": [1, 2, 3]},
+        "items": ITEMS,
+        "trailer": {"ignored": True},
+    }
+    data = json.dumps(document).encode("utf-8")
+
+    assert list(iter_json_items(_chunks(data, chunk_size), items_key="items")) == ITEMS
+
+
+def test_items_key_missing():
+    data = json.dumps({"status": "ok", "total": 0}).encode("utf-8")
+
+    assert not list(iter_json_items(_chunks(data, 3), items_key="items"))
+
+
+def test_empty_items():
+    assert not list(iter_json_items([b" [ ", b" ] "]))
+    assert not list(iter_json_items([b'{"items": []}'], items_key="items"))
+
+
+def test_numbers_split_across_chunks():
+    assert list(iter_json_items([b"[12", b"34, 5", b".", b"25, 1e", b"3]"])) == [1234, 5.25, 1000.0]
+
+
+def test_invalid_json():
+    with pytest.raises(ValueError):
+        list(iter_json_items([b'{"items": [1, 2]}']))
+    with pytest.raises(ValueError):
+        list(iter_json_items([b'[{"id": "1"} {"id": "2"}]']))
@@ -0,0 +1,252 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# tests of lib.kodi.Api converting items of the media provider into items for Kodi
+# pylint: disable=protected-access
+
+import json
+import random
+
+from dateutil import parser
+import pytest
+
+import xbmc  # pylint: disable=import-error
+import xbmcgui  # pylint: disable=import-error
+import xbmcmediaimport  # pylint: disable=import-error
+
+from lib.kodi import Api
+
+MEDIA_TYPES = (
+    xbmcmediaimport.MediaTypeMovie,
+    xbmcmediaimport.MediaTypeVideoCollection,
+    xbmcmediaimport.MediaTypeMusicVideo,
+    xbmcmediaimport.MediaTypeTvShow,
+    xbmcmediaimport.MediaTypeSeason,
+    xbmcmediaimport.MediaTypeEpisode,
+)
+
+# the video info schema with a separate item object field per Kodi info key
+SCHEMA = tuple(
+    (key, f"field{index}", converter, default, media_types)
+    for (index, (key, _, converter, default, media_types)) in enumerate(Api._get_video_info_schema())
+)
+VALUES = {
+    None: "value",
+    int: "42",
+    float: "7.5",
+    list: ("a", "b"),
+    Api._map_overview: "first\nsecond<br>third",
+    Api.convert_datetime2db_datetime: "2021-03-14T14:08:00Z",
+}
+
+
+@pytest.fixture(name="schema")
+def fixture_schema(monkeypatch):
+    monkeypatch.setattr(Api, "_get_video_info_schema", staticmethod(lambda: SCHEMA))
+    Api._compile_video_info_mapper.cache_clear()
+    yield SCHEMA
+    Api._compile_video_info_mapper.cache_clear()
+
+
+def _item_obj() -> dict:
+    # every third field is missing and every third field explicitly set to null
+    item_obj = {}
+    for index, (_, field, converter, _, _) in enumerate(SCHEMA):
+        if index % 3 == 1:
+            item_obj[field] = None
+        elif index % 3 == 2:
+            item_obj[field] = VALUES[converter]
+    return item_obj
+
+
+def _expected_infos(item_obj: dict, media_type: str) -> dict:
+    # maps every field of the schema one after the other
+    infos = {}
+    for (key, field, converter, default, media_types) in SCHEMA:
+        if media_types is not None and media_type not in media_types:
+            continue
+
+        value = item_obj.get(field)
+        if value is None:
+            infos[key] = default
+        else:
+            infos[key] = converter(value) if converter else value
+    return infos
+
+
+@pytest.mark.parametrize("media_type", MEDIA_TYPES)
+def test_fill_video_infos(schema, media_type):  # pylint: disable=unused-argument
+    item_obj = _item_obj()
+    item = xbmcgui.ListItem("Title", path="smb://nas/title.mkv")
+    item.setDateTime("2021-03-14T14:08:00Z")
+
+    Api.fill_video_infos(item_obj, media_type, item)
+
+    expected = _expected_infos(item_obj, media_type)
+    expected["mediatype"] = media_type
+    expected["filenameandpath"] = "smb://nas/title.mkv"
+    expected["title"] = "Title"
+    if media_type == xbmcmediaimport.MediaTypeTvShow:
+        expected["tvshowtitle"] = "Title"
+    expected["aired" if media_type == xbmcmediaimport.MediaTypeEpisode else "premiered"] = "2021-03-14"
+
+    assert item.getVideoInfoTag().info == expected
+    if media_type in Api.PLAYABLE_MEDIA_TYPES:
+        assert item.properties["totaltime"] == expected["duration"]
+    else:
+        assert not item.properties
+
+
+def test_fill_video_infos_interned(schema):  # pylint: disable=unused-argument
+    interner = Api.Interner()
+    items = [xbmcgui.ListItem("Title"), xbmcgui.ListItem("Title")]
+    item_obj = _item_obj()
+
+    for item in items:
+        Api.fill_video_infos(dict(item_obj), xbmcmediaimport.MediaTypeMovie, item, interner=interner)
+
+    (first, second) = (item.getVideoInfoTag().info for item in items)
+    expected = _expected_infos(item_obj, xbmcmediaimport.MediaTypeMovie)
+    expected.update({"mediatype": xbmcmediaimport.MediaTypeMovie, "filenameandpath": "", "title": "Title"})
+    assert first == second == expected
+    # values repeated between items are shared
+    assert first["genre"] is second["genre"]
+
+
+def test_mutable_defaults_are_not_shared(schema):  # pylint: disable=unused-argument
+    items = [xbmcgui.ListItem("First"), xbmcgui.ListItem("Second")]
+    for item in items:
+        Api.fill_video_infos({}, xbmcmediaimport.MediaTypeMovie, item)
+
+    (first, second) = (item.getVideoInfoTag().info for item in items)
+    assert first["genre"] == second["genre"] == []
+    assert first["genre"] is not second["genre"]
+
+    # modifying the value of one item neither changes the other item nor the schema
+    first["genre"].append("Drama")
+    assert not second["genre"]
+    assert all(not default for (key, _, _, default, _) in SCHEMA if key == "genre")
+
+
+def _convert_with_dateutil(datetime_str: str) -> str:
+    try:
+        return parser.parse(datetime_str).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return ""
+
+
+@pytest.mark.parametrize(
+    "datetime_str",
+    [
+        "2021-03-14",
+        "2021-03-14T14:08",
+        "2021-03-14T14:08:09",
+        "2021-03-14 14:08:09",
+        "2021-03-14T14:08:09Z",
+        "2021-03-14T14:08:09.1234567Z",
+        "2021-03-14T14:08:09,5",
+        "2021-03-14T14:08:09+01:00",
+        "2021-03-14T14:08:09-0530",
+        "2021-03-14T23:59:59+23:59",
+        "0001-01-01T00:00:00Z",
+        # not handled by the fast path
+        "14.03.2021 14:08",
+        "March 14, 2021",
+        "2021-03-14T14:08:09+24:00",
+        "2021-03-14T14:08:09 +01:00",
+    ],
+)
+def test_convert_datetime2db_datetime(datetime_str):
+    Api.convert_datetime2db_datetime.cache_clear()
+
+    assert Api.convert_datetime2db_datetime(datetime_str) == _convert_with_dateutil(datetime_str)
+    # converted again from the cache
+    assert Api.convert_datetime2db_datetime(datetime_str) == _convert_with_dateutil(datetime_str)
+    assert Api.convert_datetime2db_datetime.cache_info().hits == 1
+
+
+@pytest.mark.parametrize("datetime_str", ["2021-02-30", "2021-13-01T00:00:00", "2021-03-14T25:00:00", "not a date"])
+def test_convert_invalid_datetime2db_datetime(datetime_str):
+    # invalid dates are passed on to the generic parser which raises the same errors as before
+    with pytest.raises(ValueError):
+        parser.parse(datetime_str)
+    with pytest.raises(ValueError):
+        Api.convert_datetime2db_datetime(datetime_str)
+
+
+def _local_item(item_id: str = "", media_type: str = xbmcmediaimport.MediaTypeMovie, db_id: int = -1):
+    item = xbmcgui.ListItem(item_id, path=f"videodb://{media_type}/{db_id}")
+    item.setInfo("video", {"mediatype": media_type, "dbid": db_id})
+    if item_id:
+        item.getVideoInfoTag().setUniqueIDs({"stub": item_id}, "stub")
+    return item
+
+
+def _match_by_lists(local_items: list, *imported_item_id_lists) -> tuple:
+    # matches the local items by removing the matched IDs from copies of the imported lists
+    matched_item_lists = tuple([] for _ in imported_item_id_lists)
+    item_ids_to_process_lists = [list(imported_item_ids) for imported_item_ids in imported_item_id_lists]
+    for local_item in local_items:
+        local_item_id = Api.get_id_from_item(local_item)
+        for index, item_ids_to_process in enumerate(item_ids_to_process_lists):
+            if local_item_id in item_ids_to_process:
+                matched_item_lists[index].append(local_item)
+                item_ids_to_process.remove(local_item_id)
+    return matched_item_lists
+
+
+def test_match_duplicate_item_ids():
+    local_items = [_local_item(item_id) for item_id in ("a", "b", "a", "", "c", "a")]
+
+    (matched_a, matched_b) = Api.match_imported_item_ids_to_local_items(local_items, ["a", "a", "c"], ["b", "a", "x"])
+
+    # duplicate IDs are matched as often as they are imported in the order of the local items
+    assert matched_a == [local_items[0], local_items[2], local_items[4]]
+    assert matched_b == [local_items[0], local_items[1]]
+
+
+def test_match_random_item_ids():
+    rand = random.Random(4)
+    item_ids = [f"id{index}" for index in range(50)]
+    local_items = [_local_item(rand.choice(item_ids + [""])) for _ in range(500)]
+    imported_item_id_lists = [rand.choices(item_ids + ["unknown"], k=length) for length in (0, 10, 100, 300)]
+
+    matched = Api.match_imported_item_ids_to_local_items(local_items, *imported_item_id_lists)
+
+    assert matched == _match_by_lists(local_items, *imported_item_id_lists)
+
+
+def test_unique_id_index(monkeypatch):
+    requests = []
+
+    def execute_jsonrpc(request: str) -> str:
+        method = json.loads(request)["method"]
+        requests.append(method)
+        if method == "VideoLibrary.GetMovies":
+            result = {"movies": [{"movieid": db_id, "uniqueid": {"stub": f"movie{db_id}"}} for db_id in range(1, 4)]}
+        elif method == "VideoLibrary.GetEpisodes":
+            result = {"episodes": [{"episodeid": 1, "uniqueid": {"imdb": "tt1"}}]}
+        else:
+            result = {}
+        return json.dumps({"result": result})
+
+    monkeypatch.setattr(xbmc, "executeJSONRPC", execute_jsonrpc)
+
+    local_items = [
+        _local_item(media_type=xbmcmediaimport.MediaTypeMovie, db_id=3),
+        _local_item(media_type=xbmcmediaimport.MediaTypeEpisode, db_id=1),
+        _local_item("movie2", media_type=xbmcmediaimport.MediaTypeMovie, db_id=2),
+        _local_item(media_type=xbmcmediaimport.MediaTypeMovie, db_id=1),
+        _local_item(media_type=xbmcmediaimport.MediaTypeMovie, db_id=42),
+    ]
+
+    (matched,) = Api.match_imported_item_ids_to_local_items(local_items, ["movie1", "movie2", "movie3", "episode1"])
+
+    assert matched == [local_items[0], local_items[2], local_items[3]]
+    # the unique IDs are retrieved once per media type instead of once per local item
+    assert sorted(requests) == ["VideoLibrary.GetEpisodes", "VideoLibrary.GetMovies"]
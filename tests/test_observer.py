@@ -0,0 +1,86 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# tests of lib.observer.ObserverService processing stand-in observers
+
+import pytest
+
+from lib import observer as observer_module
+from lib.observer import ObserverService
+
+
+class StandInObserver:
+    def __init__(self, fail_processing: bool = False, fail_stopping: bool = False):
+        self.fail_processing = fail_processing
+        self.fail_stopping = fail_stopping
+        self.processed = 0
+        self.stopped = False
+        self.connected = False
+
+    def process(self, changes=None):  # pylint: disable=unused-argument
+        self.processed += 1
+        if self.fail_processing and not self.stopped:
+            raise RuntimeError("cannot process")
+
+    def prepare_retrieval(self):
+        return None
+
+    def next_process(self, retrieving: bool = False) -> float:  # pylint: disable=unused-argument
+        return 0.0
+
+    def stop(self):
+        self.stopped = True
+        if self.fail_stopping:
+            raise RuntimeError("cannot stop")
+
+
+class StandInMonitor:
+    def abortRequested(self):  # pylint: disable=invalid-name
+        return False
+
+    def waitForAbort(self, timeout=-1):  # pylint: disable=invalid-name,unused-argument
+        # abort after processing the observers once
+        return True
+
+
+def _observe(observers: dict):
+    class StandInObserverService(ObserverService):
+        def _run(self):
+            self._observers.update(observers)
+            super()._run()
+
+    return StandInObserverService()
+
+
+@pytest.fixture(autouse=True)
+def fixture_monitor(monkeypatch):
+    monkeypatch.setattr(observer_module, "Monitor", StandInMonitor)
+
+
+def test_failing_observer_does_not_stop_others():
+    observers = {
+        "failing": StandInObserver(fail_processing=True, fail_stopping=True),
+        "working": StandInObserver(),
+    }
+    _observe(observers)
+
+    assert observers["working"].processed == 2
+    assert all(observer.stopped for observer in observers.values())
+
+
+def test_observers_are_stopped_on_unexpected_errors(monkeypatch):
+    def next_timeout(_):
+        raise RuntimeError("unexpected")
+
+    monkeypatch.setattr(ObserverService, "_next_timeout", next_timeout)
+
+    observers = {"working": StandInObserver()}
+    with pytest.raises(RuntimeError):
+        _observe(observers)
+
+    assert observers["working"].stopped
@@ -0,0 +1,91 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# tests of lib.path_mapping.PathMapper substituting and normalizing the paths provided by a media provider
+
+import pytest
+
+from lib.path_mapping import PathMapper
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("/media/movies/a.mkv", "smb://nas/movies/a.mkv"),
+        # the source path only matches at a path separator
+        ("/media2/a.mkv", "/media2/a.mkv"),
+        ("/media/movies2/a.mkv", "nfs://media/movies2/a.mkv"),
+        ("/media/moviesa.mkv", "nfs://media/moviesa.mkv"),
+        # the longest matching source path wins
+        ("/media/movies/kids/a.mkv", "smb://kids/a.mkv"),
+        ("/media/other/a.mkv", "nfs://media/other/a.mkv"),
+        # source paths ending with a separator
+        ("/tv/show/e.mkv", "smb://nas/tv/show/e.mkv"),
+        ("/tvshows/e.mkv", "/tvshows/e.mkv"),
+        # Windows paths are turned into URLs with slashes only
+        ("D:\\Movies\\A\\a.mkv", "smb://nas/movies/A/a.mkv"),
+        ("D:\\Movies2\\a.mkv", "D:\\Movies2\\a.mkv"),
+    ],
+)
+def test_substitutions(path, expected):
+    path_mapper = PathMapper(
+        [
+            ("/media", "nfs://media"),
+            ("/media/movies", "smb://nas/movies"),
+            ("/media/movies/kids", "smb://kids"),
+            ("/media/movies/kids", "smb://ignored"),
+            ("/tv/", "smb://nas/tv/"),
+            ("D:\\Movies", "smb://nas/movies"),
+        ]
+    )
+
+    assert path_mapper.map(path) == expected
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        # UNC paths are turned into Samba URLs
+        ("\\\\server\\share\\dir\\a.mkv", "smb://server/share/dir/a.mkv"),
+        ("\\\\server\\\\share\\a.mkv", "smb://server/share/a.mkv"),
+        # protocols are lower case and URLs only use slashes
+        ("SMB://Server/Share/a.mkv", "smb://Server/Share/a.mkv"),
+        ("nfs://server\\share\\a.mkv", "nfs://server/share/a.mkv"),
+        # other paths containing backslashes only use backslashes
+        ("C:\\dir/sub\\a.mkv", "C:\\dir\\sub\\a.mkv"),
+        ("C:\\\\dir\\\\a.mkv", "C:\\dir\\a.mkv"),
+        ("/unix/path/a.mkv", "/unix/path/a.mkv"),
+    ],
+)
+def test_normalization(path, expected):
+    assert PathMapper().map(path) == expected
+
+
+def test_containers():
+    path_mapper = PathMapper()
+
+    assert path_mapper.map("smb://nas/Movie", container="dvd") == "smb://nas/Movie/VIDEO_TS/VIDEO_TS.IFO"
+    assert path_mapper.map("D:\\Movie", container="bluray") == "D:\\Movie\\BDMV\\index.bdmv"
+    assert path_mapper.map("smb://nas/Movie.mkv", container="mkv") == "smb://nas/Movie.mkv"
+
+
+def test_directories_are_cached():
+    path_mapper = PathMapper([("/media", "smb://nas")])
+
+    paths = [path_mapper.map(f"/media/movies/{index}.mkv") for index in range(100)]
+
+    assert paths == [f"smb://nas/movies/{index}.mkv" for index in range(100)]
+    assert path_mapper.cache_info().misses == 1
+    assert path_mapper.cache_info().hits == 99
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        PathMapper([("", "smb://nas")])
+    with pytest.raises(ValueError):
+        PathMapper(cache_size=0)
@@ -0,0 +1,105 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# tests of lib.pipeline.PagePrefetcher retrieving pages from a stand-in media provider
+
+import threading
+import time
+
+import pytest
+
+from lib.pipeline import PagePrefetcher
+
+PAGES = 10
+PAGE_SIZE = 3
+
+
+class StandInPages:
+    def __init__(self, pages: int = PAGES, delay: float = 0.0):
+        self.pages = pages
+        self.delay = delay
+        # indices of all requested pages
+        self.requested = []
+        # retrieving the pages from this index on hangs until release is set
+        self.hang_from = None
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, index: int) -> list:
+        with self._lock:
+            self.requested.append(index)
+
+        if self.hang_from is not None and index >= self.hang_from:
+            self.release.wait()
+        # later pages are retrieved faster than earlier ones
+        time.sleep(self.delay * (self.pages - index) / self.pages)
+
+        if index >= self.pages:
+            return []
+        return [index * PAGE_SIZE + item for item in range(PAGE_SIZE)]
+
+
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+def test_pages_are_yielded_in_order(prefetch):
+    pages = StandInPages(delay=0.01)
+
+    items = [item for page in PagePrefetcher(pages, prefetch=prefetch) for item in page]
+
+    assert items == list(range(PAGES * PAGE_SIZE))
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_prefetched_pages_are_bounded(prefetch):
+    pages = StandInPages()
+
+    for index, _ in enumerate(PagePrefetcher(pages, prefetch=prefetch)):
+        # only the pages following the one being processed have been requested
+        assert max(pages.requested) <= index + prefetch
+
+
+def test_stop_when_cancelled_while_waiting(monkeypatch):
+    monkeypatch.setattr(PagePrefetcher, "CANCEL_CHECK_INTERVAL", 0.01)
+    cancelled = threading.Event()
+    pages = StandInPages()
+    # the second page hangs on the media provider until the import is cancelled
+    pages.hang_from = 1
+
+    iterator = iter(PagePrefetcher(pages, cancelled=cancelled.is_set))
+    assert next(iterator) == [0, 1, 2]
+
+    timer = threading.Timer(0.05, cancelled.set)
+    timer.start()
+    start = time.monotonic()
+    remaining = list(iterator)
+    duration = time.monotonic() - start
+    pages.release.set()
+    timer.join()
+
+    assert not remaining
+    assert duration < 1.0
+
+
+def test_no_pages_requested_after_cancel():
+    cancelled = threading.Event()
+    pages = StandInPages()
+
+    yielded = []
+    for page in PagePrefetcher(pages, prefetch=2, cancelled=cancelled.is_set):
+        yielded.append(page)
+        cancelled.set()
+
+    # neither the already prefetched pages are yielded nor any further pages requested
+    assert yielded == [[0, 1, 2]]
+    assert set(pages.requested) <= {0, 1, 2}
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        PagePrefetcher(None)
+    with pytest.raises(ValueError):
+        PagePrefetcher(StandInPages(), prefetch=-1)
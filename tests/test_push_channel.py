@@ -0,0 +1,218 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# tests of lib.push_channel.PushChannel against a stand-in media provider pushing server-sent events
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import queue
+import threading
+import time
+
+import pytest
+
+from lib.client import ProviderClient
+from lib.push_channel import PushChannel
+
+EVENTS_PATH = "/events"
+
+
+class StandInEventSource(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInEventSource.Handler)
+        # status of the responses to requests for the event stream
+        self.status = 200
+        # Last-Event-ID header of every request for the event stream
+        self.last_event_ids = []
+        # (event ID, data) or raw bytes to push or None to close the event stream
+        self.events = queue.Queue()
+        self.connected = threading.Event()
+        self.closed = threading.Event()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def push(self, event_id: str, data: dict):
+        self.events.put((event_id, data))
+
+    def push_raw(self, data: bytes):
+        self.events.put(data)
+
+    def drop(self):
+        self.connected.clear()
+        self.events.put(None)
+
+    def close(self):
+        self.closed.set()
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        # clients disconnecting from the event stream are expected
+        pass
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            pass
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            self.server.last_event_ids.append(self.headers.get("Last-Event-ID"))
+            if self.server.status != 200:
+                self.send_response(self.server.status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(b": connected\n\n")
+            self.wfile.flush()
+            self.server.connected.set()
+
+            while not self.server.closed.is_set():
+                try:
+                    event = self.server.events.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+
+                if event is None:
+                    return
+
+                if isinstance(event, bytes):
+                    self.wfile.write(event)
+                else:
+                    (event_id, data) = event
+                    self.wfile.write(f"id: {event_id}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+
+@pytest.fixture(name="provider")
+def fixture_provider():
+    provider = StandInEventSource()
+    yield provider
+    provider.close()
+
+
+@pytest.fixture(name="short_delays")
+def fixture_short_delays(monkeypatch):
+    monkeypatch.setattr(PushChannel, "RECONNECT_DELAY", 0.01)
+    monkeypatch.setattr(PushChannel, "MAX_RECONNECT_DELAY", 0.05)
+
+
+def test_pushed_events_are_received_immediately(provider):
+    received = threading.Event()
+    channel = PushChannel(ProviderClient(provider.url), EVENTS_PATH, on_event=received.set)
+    channel.start()
+    try:
+        assert provider.connected.wait(5)
+
+        latencies = []
+        for index in range(20):
+            received.clear()
+            start = time.perf_counter()
+            provider.push(str(index), {"item": index})
+            assert received.wait(5)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        channel.stop()
+
+    assert [event["item"] for event in channel.events()] == list(range(20))
+
+    latencies.sort()
+    print(f"\npushed event received after {latencies[len(latencies) // 2] * 1000:.2f}ms (median)")
+    assert latencies[len(latencies) // 2] < 0.1
+
+
+def test_reconnect_resumes_after_last_event_id(provider, short_delays):  # pylint: disable=unused-argument
+    received = threading.Event()
+    channel = PushChannel(ProviderClient(provider.url), EVENTS_PATH, on_event=received.set)
+    channel.start()
+    try:
+        assert provider.connected.wait(5)
+        provider.push("42", {"item": 1})
+        assert received.wait(5)
+
+        # the media provider closes the event stream
+        provider.drop()
+        assert provider.connected.wait(5)
+
+        # the media provider has accepted the connection before the channel has received the response
+        deadline = time.monotonic() + 5
+        while channel.connections < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        channel.stop()
+
+    assert provider.last_event_ids[:2] == [None, "42"]
+    assert channel.connections >= 2
+
+
+def test_reconnect_resends_interrupted_event(provider, short_delays):  # pylint: disable=unused-argument
+    received = threading.Event()
+    channel = PushChannel(ProviderClient(provider.url), EVENTS_PATH, on_event=received.set)
+    channel.start()
+    try:
+        assert provider.connected.wait(5)
+        provider.push("1", {"item": 1})
+        assert received.wait(5)
+
+        # the event stream is dropped after the ID but before the end of the next event
+        provider.push_raw(b'id: 2\ndata: {"item": 2}\n')
+        provider.drop()
+        assert provider.connected.wait(5)
+    finally:
+        channel.stop()
+
+    # the interrupted event has neither been dispatched nor acknowledged by its ID
+    assert [event["item"] for event in channel.events()] == [1]
+    assert provider.last_event_ids[:2] == [None, "1"]
+
+
+def test_fallback_after_failures(provider, short_delays):  # pylint: disable=unused-argument
+    provider.status = 503
+    channel = PushChannel(ProviderClient(provider.url), EVENTS_PATH)
+    channel.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not channel.fallback and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert channel.fallback
+        assert len(provider.last_event_ids) >= PushChannel.FALLBACK_AFTER_FAILURES
+
+        # the media provider can push its changes again
+        provider.status = 200
+        assert provider.connected.wait(5)
+        deadline = time.monotonic() + 5
+        while channel.fallback and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert not channel.fallback
+    finally:
+        channel.stop()
+
+
+def test_stop_while_connected(provider):
+    channel = PushChannel(ProviderClient(provider.url), EVENTS_PATH)
+    channel.start()
+    assert provider.connected.wait(5)
+
+    # stopping interrupts the blocking read instead of waiting for the read timeout
+    start = time.monotonic()
+    channel.stop()
+    duration = time.monotonic() - start
+
+    assert not channel.connected
+    assert duration < 0.5
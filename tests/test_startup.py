@@ -0,0 +1,62 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# startup benchmark of importer actions which Kodi executes in a fresh interpreter each
+# run with "python -m pytest -s tests/test_startup.py" to see the import times
+
+import os
+import subprocess
+import sys
+
+from conftest import ROOT_PATH, STUBS_PATH
+
+# modules which must only be imported by the actions needing them
+LAZY_MODULES = ("dateutil", "lib.action_server", "lib.kodi", "lib.pipeline", "socket", "socketserver", "xbmcgui")
+
+RUN_ACTION = """
+import runpy
+import sys
+
+sys.argv = ["plugin://mediaimporter.stub/{action}", "1", "?"]
+runpy.run_path("importer.py", run_name="__main__")
+"""
+
+
+def _import_times(action: str) -> dict:
+    # module => cumulative import time in microseconds as reported by python -X importtime
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([STUBS_PATH, ROOT_PATH] + sys.path)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUN_ACTION.format(action=action)],
+        cwd=ROOT_PATH,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        (_, cumulative, module) = line[len("import time:") :].split("|")
+        import_times[module.strip()] = int(cumulative)
+
+    return import_times
+
+
+def test_constant_action_startup():
+    import_times = _import_times("canupdateplaycountonprovider")
+
+    print(f"\nlib.importer: {import_times['lib.importer'] / 1000:.1f}ms")
+    print(f"lib.action_client: {import_times['lib.action_client'] / 1000:.1f}ms")
+
+    assert "lib.importer" in import_times
+    for module in LAZY_MODULES:
+        assert module not in import_times, f"{module} imported by a constant action"
@@ -0,0 +1,68 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#  Copyright (C) 2021 Sascha Montellese <montellese@kodi.tv>
+#
+#  SPDX-License-Identifier: GPL-2.0-or-later
+#  See LICENSES/README.md for more information.
+#
+
+# the update log is shared by the observer service and importer actions executed in separate interpreters
+
+import os
+import subprocess
+import sys
+
+from conftest import ROOT_PATH, STUBS_PATH
+
+from lib.update_log import UpdateLog
+from lib.utils import get_profile_path
+
+URL = "http://provider"
+UPDATES = 200
+COMPACTION_THRESHOLD = 5
+
+WRITE_UPDATES = """
+import sys
+
+from lib.update_log import UpdateLog
+
+update_log = UpdateLog("{filename}", compaction_threshold={threshold})
+for i in range({updates}):
+    sequence = update_log.append("{url}", f"{{sys.argv[1]}}-{{i}}", {{"playcount": i}})
+    # acknowledge every other update to let the log be compacted frequently
+    if i % 2:
+        update_log.acknowledge("{url}", {{f"{{sys.argv[1]}}-{{i}}": sequence}})
+"""
+
+
+def _write_updates(env: dict, filename: str, writer: str) -> subprocess.Popen:
+    code = WRITE_UPDATES.format(filename=filename, threshold=COMPACTION_THRESHOLD, updates=UPDATES, url=URL)
+    return subprocess.Popen([sys.executable, "-c", code, writer], cwd=ROOT_PATH, env=env)
+
+
+def test_concurrent_interpreters():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([STUBS_PATH, ROOT_PATH] + sys.path)
+    writers = [_write_updates(env, "concurrent.wal", writer) for writer in ("a", "b", "c", "d")]
+    for writer in writers:
+        assert writer.wait() == 0
+
+    # none of the updates which haven't been acknowledged may have been lost by compacting the log
+    expected = {f"{writer}-{i}" for writer in ("a", "b", "c", "d") for i in range(0, UPDATES, 2)}
+    pending = UpdateLog("concurrent.wal").pending(URL)
+    assert set(pending) == expected
+
+    sequences = [sequence for (sequence, _) in pending.values()]
+    assert len(set(sequences)) == len(sequences)
+
+
+def test_partially_written_record():
+    # e.g. written by a crashed interpreter
+    with open(get_profile_path("partial.wal"), "w", encoding="utf-8") as log_file:
+        log_file.write(f'{{"seq": 1, "url": "{URL}", "id": "a", "update": {{}}}}\n{{"seq": 2, "url": "{URL}", "id')
+
+    update_log = UpdateLog("partial.wal")
+    assert set(update_log.pending(URL)) == {"a"}
+
+    update_log.append(URL, "b", {})
+    assert set(UpdateLog("partial.wal").pending(URL)) == {"a", "b"}